@@ -0,0 +1,67 @@
+"""
+Offline inference throughput for different batch sizes.
+
+Collates letterboxed images the same way `detect.run --batch-size` does and reports images per second including
+per-item NMS, by default for bs=1/4/8/16 on CPU.
+
+Usage:
+    $ python benchmarks/bench_batch.py --weights yolov5n.pt --source data/images --batch-sizes 1 4 8 16
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from models.common import DetectMultiBackend
+from pipeline.batching import collate, item_slice
+from utils.dataloaders import LoadImages
+from utils.general import check_img_size, non_max_suppression
+from utils.torch_utils import select_device
+
+
+def bench(model, opt, batch_size):
+    """Images per second over --images images (the source is cycled as needed)"""
+    imgsz = check_img_size([opt.imgsz] * 2, s=model.stride)
+    model.warmup(imgsz=(batch_size, 3, *imgsz))
+    n, t = 0, time.perf_counter()
+    while n < opt.images:
+        dataset = LoadImages(opt.source, img_size=imgsz, stride=model.stride, auto=model.pt and batch_size == 1)
+        for path, im, im0s, vid_cap, s, frame, mode in collate(dataset, batch_size):
+            im = torch.from_numpy(im).to(model.device)
+            im = (im.half() if model.fp16 else im.float()) / 255
+            pred = model(im)
+            for j in range(len(path)):
+                non_max_suppression(item_slice(pred, j, j + 1), opt.conf_thres, opt.iou_thres, max_det=opt.max_det)
+            n += len(path)
+            if n >= opt.images:
+                break
+    return n / (time.perf_counter() - t)
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default=ROOT / "yolov5n.pt", help="model path")
+    parser.add_argument("--source", type=str, default=ROOT / "data/images", help="image directory or video file")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference size")
+    parser.add_argument("--images", type=int, default=256, help="images per batch size")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8, 16], help="batch sizes to compare")
+    parser.add_argument("--conf-thres", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--iou-thres", type=float, default=0.45, help="NMS IoU threshold")
+    parser.add_argument("--max-det", type=int, default=1000, help="maximum detections per image")
+    parser.add_argument("--device", default="cpu", help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    model = DetectMultiBackend(opt.weights, device=select_device(opt.device))
+    with torch.no_grad():
+        for bs in opt.batch_sizes:
+            print(f"bs={bs:>3}: {bench(model, opt, bs):7.1f} img/s")
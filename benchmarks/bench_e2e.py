@@ -0,0 +1,168 @@
+"""
+End-to-end benchmark of detect.run with per-stage latency percentiles.
+
+`run` drives detect.run over generated inputs (captured_image.jpg repeated as a video and a clip of moving boxes),
+each scenario in a fresh process so peak RSS is its own, and saves p50/p95/p99 per stage, FPS, peak RSS and CPU% as
+JSON. `compare` flags regressions of a result against a stored baseline and exits non-zero if there are any.
+
+Usage:
+    $ python benchmarks/bench_e2e.py run --weights yolov5n.pt --frames 300 --out results.json
+    $ python benchmarks/bench_e2e.py run --set tracker='byte' --set pipeline=True --out byte.json
+    $ python benchmarks/bench_e2e.py compare baseline.json results.json --tolerance 0.1
+"""
+
+import argparse
+import ast
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+
+def still_video(path, frames, image=ROOT / "captured_image.jpg", fps=30):
+    """Repeat one image as a video"""
+    im = cv2.imread(str(image))
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (im.shape[1], im.shape[0]))
+    for _ in range(frames):
+        writer.write(im)
+    writer.release()
+
+
+def moving_boxes_video(path, frames, objects=20, size=(720, 1280), fps=30, seed=0):
+    """Coloured boxes bouncing over a noisy background"""
+    h, w = size
+    rng = np.random.default_rng(seed)
+    wh = rng.uniform(20, 120, (objects, 2))
+    xy = rng.uniform(0, 1, (objects, 2)) * ((w, h) - wh)
+    v = rng.uniform(-8, 8, (objects, 2))
+    colors = rng.integers(0, 255, (objects, 3)).tolist()
+    background = rng.integers(90, 140, (h, w, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    for _ in range(frames):
+        im = background.copy()
+        for (x, y), (bw, bh), c in zip(xy.astype(int), wh.astype(int), colors):
+            cv2.rectangle(im, (x, y), (x + bw, y + bh), c, -1)
+        writer.write(im)
+        xy += v
+        bounce = (xy < 0) | (xy > (w, h) - wh)
+        v[bounce] *= -1
+        xy = np.clip(xy, 0, (w, h) - wh)
+    writer.release()
+
+
+def run_scenario(source, kwargs):
+    """Run detect.run once in this process and return its measurements"""
+    import detect
+    from pipeline.metrics import StageRecorder
+
+    recorder = StageRecorder()
+    detect.run(source=source, recorder=recorder, **kwargs)
+    end, cpu_end = time.perf_counter(), time.process_time()
+    frames = recorder.counters["frames"]
+    wall = end - (recorder.started or end)
+    cpu = cpu_end - (recorder.cpu_started or cpu_end)
+    return {
+        "frames": frames,
+        "wall_s": wall,
+        "fps": frames / wall if wall else 0.0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # kilobytes on Linux
+        "cpu_percent": 100 * cpu / wall if wall else 0.0,  # all threads, can exceed 100
+        "stages": recorder.summary(),
+    }
+
+
+def run(opt):
+    overrides = {k: ast.literal_eval(v) for k, v in (s.split("=", 1) for s in opt.set)}
+    results = {}
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        still_video(d / "still.mp4", opt.frames)
+        moving_boxes_video(d / "moving.mp4", opt.frames)
+        kwargs = dict(
+            weights=opt.weights,
+            imgsz=(opt.imgsz, opt.imgsz),
+            device=opt.device,
+            nosave=not opt.save,
+            project=d / "runs",
+            exist_ok=True,
+            **overrides,
+        )
+        for name in ("still", "moving"):
+            # A fresh process per scenario keeps peak RSS and warm caches from leaking between them
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results[name] = pool.submit(run_scenario, str(d / f"{name}.mp4"), {**kwargs, "name": name}).result()
+            r = results[name]
+            print(f"{name:>7}: {r['fps']:7.1f} FPS, {r['peak_rss_mb']:7.1f} MB peak RSS, {r['cpu_percent']:5.0f}% CPU")
+            for stage, s in r["stages"].items():
+                print(f"{'':>9}{stage:>10}: p50 {s['p50']:8.2f}  p95 {s['p95']:8.2f}  p99 {s['p99']:8.2f} ms")
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "config": {k: str(v) for k, v in vars(opt).items() if k != "func"},
+        "scenarios": results,
+    }
+    Path(opt.out).write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {opt.out}")
+
+
+def compare(opt):
+    """Print every metric that got worse than baseline by more than the tolerance, exit 1 if any did"""
+    baseline = json.loads(Path(opt.baseline).read_text())["scenarios"]
+    current = json.loads(Path(opt.current).read_text())["scenarios"]
+    tol, regressions = opt.tolerance, []
+    for name in sorted(baseline.keys() & current.keys()):
+        b, c = baseline[name], current[name]
+        if c["fps"] < b["fps"] * (1 - tol):
+            regressions.append(f"{name} FPS {b['fps']:.1f} -> {c['fps']:.1f}")
+        if c["peak_rss_mb"] > b["peak_rss_mb"] * (1 + tol):
+            regressions.append(f"{name} peak RSS {b['peak_rss_mb']:.1f} -> {c['peak_rss_mb']:.1f} MB")
+        for stage in sorted(b["stages"].keys() & c["stages"].keys()):
+            for p in ("p50", "p95", "p99"):
+                old, new = b["stages"][stage][p], c["stages"][stage][p]
+                if new > old * (1 + tol) and new - old > opt.min_ms:  # ignore noise on sub-millisecond stages
+                    regressions.append(f"{name} {stage} {p} {old:.2f} -> {new:.2f} ms")
+    for r in regressions:
+        print(f"REGRESSION {r}")
+    print(f"{len(regressions)} regressions at {tol:.0%} tolerance")
+    sys.exit(1 if regressions else 0)
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("run", help="benchmark detect.run and save JSON")
+    r.add_argument("--weights", type=str, default=str(ROOT / "yolov5n.pt"), help="model path")
+    r.add_argument("--imgsz", type=int, default=640, help="inference size")
+    r.add_argument("--device", default="cpu", help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
+    r.add_argument("--frames", type=int, default=300, help="frames per generated clip")
+    r.add_argument("--save", action="store_true", help="also encode the output videos")
+    r.add_argument("--set", action="append", default=[], help="extra detect.run kwarg as key=python-literal")
+    r.add_argument("--out", type=str, default="bench_e2e.json", help="JSON results file")
+    r.set_defaults(func=run)
+    c = sub.add_parser("compare", help="flag regressions against a baseline JSON")
+    c.add_argument("baseline", type=str, help="stored baseline results")
+    c.add_argument("current", type=str, help="new results")
+    c.add_argument("--tolerance", type=float, default=0.1, help="allowed relative slowdown")
+    c.add_argument("--min-ms", type=float, default=0.5, help="ignore latency changes smaller than this")
+    c.set_defaults(func=compare)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    opt.func(opt)
@@ -0,0 +1,83 @@
+"""
+Time-to-model-ready of the assistants' model loading, each start in a fresh process.
+
+Modes: `hub` is the old torch.hub.load('ultralytics/yolov5', 'yolov5n') (needs network), `cold` is load_model with an
+empty cache (fuse and pickle), `warm` is load_model memory-mapping the cached artifact. Every start reports import,
+load and first-inference time plus the whole process wall time, median over --runs.
+
+Usage:
+    $ python benchmarks/bench_model_load.py --modes hub cold warm --runs 5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+
+def child(mode, cache_dir, image):
+    """One start: import, load, first inference, printed as JSON seconds"""
+    t0 = time.perf_counter()
+    import cv2
+    import torch
+
+    from pipeline.model_cache import load_model
+
+    t1 = time.perf_counter()
+    if mode == "hub":
+        model = torch.hub.load("ultralytics/yolov5", "yolov5n", pretrained=True).eval()
+    else:
+        model = load_model(cache_dir=cache_dir)
+    t2 = time.perf_counter()
+    model(cv2.imread(image))
+    t3 = time.perf_counter()
+    print(json.dumps({"import": t1 - t0, "load": t2 - t1, "first": t3 - t2}))
+
+
+def start(mode, cache_dir, image):
+    """Run one start in a fresh interpreter, returns its timings including the process wall time"""
+    if mode == "cold":
+        for f in Path(cache_dir).glob("*.pt"):
+            f.unlink()
+    cmd = [sys.executable, __file__, "--child", mode, "--cache-dir", str(cache_dir), "--image", str(image)]
+    t = time.perf_counter()
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    wall = time.perf_counter() - t
+    return {**json.loads(out.strip().splitlines()[-1]), "wall": wall}
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", default=["cold", "warm"], choices=["hub", "cold", "warm"], help="loaders")
+    parser.add_argument("--runs", type=int, default=5, help="starts per mode")
+    parser.add_argument("--image", type=str, default=ROOT / "captured_image.jpg", help="first-inference image")
+    parser.add_argument("--cache-dir", type=str, default="", help="artifact cache, a temporary one by default")
+    parser.add_argument("--child", type=str, default="", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    if opt.child:
+        child(opt.child, opt.cache_dir, str(opt.image))
+        sys.exit()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = opt.cache_dir or tmp
+        for mode in opt.modes:
+            if mode == "warm":
+                start("cold", cache_dir, opt.image)  # make sure the artifact exists
+            runs = [start(mode, cache_dir, opt.image) for _ in range(opt.runs)]
+            s = {k: np.median([r[k] for r in runs]) * 1e3 for k in runs[0]}
+            print(
+                f"{mode:>5}: ready in {s['import'] + s['load']:7.0f} ms (import {s['import']:6.0f}, load "
+                f"{s['load']:6.0f}), first inference {s['first']:6.0f} ms, process wall {s['wall']:6.0f} ms"
+            )
@@ -0,0 +1,122 @@
+"""
+CPU speed and mAP sanity check of quantized exports against the FP32 model.
+
+Runs every --weights over the same local images and reports ms/image, mAP@0.5 and mAP@0.5:0.95. With --labels the
+reference is the YOLO-format ground truth. Without labels it is the first model's detections above --ref-conf, so the
+numbers say how closely each export reproduces FP32 rather than how good the model is.
+
+Usage:
+    $ python quantize.py --weights yolov5n.pt --data calib/ --format openvino
+    $ python benchmarks/bench_quantized.py --source val/images --labels val/labels \
+        --weights yolov5n.pt yolov5n.onnx yolov5n_int8.onnx yolov5n_int8_openvino_model
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from models.common import DetectMultiBackend
+from utils.augmentations import letterbox
+from utils.dataloaders import IMG_FORMATS
+from utils.general import check_img_size, cv2, non_max_suppression, scale_boxes
+from utils.metrics import ap_per_class, box_iou
+from utils.torch_utils import select_device
+
+
+def load_labels(path, w, h):
+    """YOLO normalized xywh label file to an (N, 5) [cls, x1, y1, x2, y2] pixel tensor"""
+    if not path.exists():
+        return torch.zeros((0, 5))
+    cls, xywh = np.split(np.loadtxt(path, ndmin=2, dtype=np.float32)[:, :5], [1], axis=1)
+    xywh *= (w, h, w, h)
+    return torch.from_numpy(np.concatenate((cls, xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2), 1))
+
+
+def process_batch(detections, labels, iouv):
+    """Correct-prediction matrix (N, 10) of detections [x1, y1, x2, y2, conf, cls] against labels [cls, xyxy]"""
+    correct = np.zeros((detections.shape[0], iouv.shape[0]), dtype=bool)
+    iou = box_iou(labels[:, 1:], detections[:, :4])
+    correct_class = labels[:, 0:1] == detections[:, 5]
+    for i in range(len(iouv)):
+        x = torch.where((iou >= iouv[i]) & correct_class)  # IoU > threshold and classes match
+        if x[0].shape[0]:
+            matches = torch.cat((torch.stack(x, 1), iou[x[0], x[1]][:, None]), 1).cpu().numpy()  # [label, det, iou]
+            if x[0].shape[0] > 1:
+                matches = matches[matches[:, 2].argsort()[::-1]]
+                matches = matches[np.unique(matches[:, 1], return_index=True)[1]]
+                matches = matches[np.unique(matches[:, 0], return_index=True)[1]]
+            correct[matches[:, 1].astype(int), i] = True
+    return torch.from_numpy(correct)
+
+
+def predict(weights, files, opt):
+    """Detections of every file in original pixels and mean ms per image (preprocess, inference and NMS)"""
+    model = DetectMultiBackend(weights, device=select_device(opt.device))
+    imgsz = check_img_size([opt.imgsz] * 2, s=model.stride)
+    model.warmup(imgsz=(1, 3, *imgsz))
+    dets, times = [], []
+    for f in files:
+        im0 = cv2.imread(str(f))
+        t = time.perf_counter()
+        im = letterbox(im0, imgsz, stride=model.stride, auto=False)[0]
+        im = torch.from_numpy(np.ascontiguousarray(im.transpose((2, 0, 1))[::-1])).to(model.device)[None]
+        im = (im.half() if model.fp16 else im.float()) / 255
+        det = non_max_suppression(model(im), opt.conf_thres, opt.iou_thres, max_det=opt.max_det)[0]
+        det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape)
+        times.append(time.perf_counter() - t)
+        dets.append(det.cpu())
+    return dets, np.mean(times[1:] if len(times) > 1 else times) * 1e3
+
+
+def evaluate(dets, targets):
+    """(mAP@0.5, mAP@0.5:0.95) of per-image detections against per-image [cls, xyxy] targets"""
+    iouv = torch.linspace(0.5, 0.95, 10)
+    stats = []
+    for det, labels in zip(dets, targets):
+        correct = process_batch(det, labels, iouv) if len(det) else torch.zeros((0, 10), dtype=torch.bool)
+        stats.append((correct, det[:, 4], det[:, 5], labels[:, 0]))
+    tp, conf, pred_cls, target_cls = (torch.cat(x, 0).numpy() for x in zip(*stats))
+    if not len(target_cls) or not tp.any():
+        return 0.0, 0.0
+    ap = ap_per_class(tp, conf, pred_cls, target_cls)[5]
+    return float(ap[:, 0].mean()), float(ap.mean())
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", nargs="+", type=str, default=[ROOT / "yolov5n.pt"], help="models, FP32 first")
+    parser.add_argument("--source", type=str, required=True, help="image folder")
+    parser.add_argument("--labels", type=str, default="", help="YOLO-format labels, else the first model is reference")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference size")
+    parser.add_argument("--conf-thres", type=float, default=0.001, help="confidence threshold for mAP")
+    parser.add_argument("--ref-conf", type=float, default=0.25, help="confidence of reference detections")
+    parser.add_argument("--iou-thres", type=float, default=0.6, help="NMS IoU threshold")
+    parser.add_argument("--max-det", type=int, default=300, help="maximum detections per image")
+    parser.add_argument("--device", default="cpu", help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    files = sorted(p for p in Path(opt.source).iterdir() if p.suffix[1:].lower() in IMG_FORMATS)
+    targets = None
+    if opt.labels:
+        targets = []
+        for f in files:
+            h, w = cv2.imread(str(f)).shape[:2]
+            targets.append(load_labels(Path(opt.labels) / f"{f.stem}.txt", w, h))
+    with torch.no_grad():
+        for weights in opt.weights:
+            dets, ms = predict(weights, files, opt)
+            if targets is None:  # FP32 detections are the reference for the exports
+                targets = [d[d[:, 4] >= opt.ref_conf][:, [5, 0, 1, 2, 3]] for d in dets]
+            map50, map50_95 = evaluate(dets, targets)
+            print(f"{Path(weights).name:>32}: {ms:7.1f} ms/image, mAP@0.5 {map50:.3f}, mAP@0.5:0.95 {map50_95:.3f}")
@@ -0,0 +1,96 @@
+"""
+Latency and throughput of the resident detection server for 1 to 16 concurrent clients.
+
+Every client thread sends captured_image.jpg for --seconds and records the round-trip time of each request. Reports
+requests per second and p50/p95/p99 latency per client count, so the gain of micro-batching under load can be read
+against the latency it adds. Starts its own server unless --url points at a running one.
+
+Usage:
+    $ python benchmarks/bench_server.py --weights yolov5n.pt --clients 1 2 4 8 16 --max-wait 0.005
+    $ python benchmarks/bench_server.py --url http://127.0.0.1:8765
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from pipeline.server import DetectionClient
+
+
+def connect(url, timeout=120.0):
+    """Client of the server at url, waiting for it to finish loading the model"""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            return DetectionClient(url)
+        except (ConnectionError, OSError):
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.5)
+
+
+def bench(client, im, n_clients, seconds):
+    """Requests per second and latencies in ms with n_clients threads sending im back to back"""
+    latencies = [[] for _ in range(n_clients)]
+    stop = time.perf_counter() + seconds
+
+    def work(out):
+        while time.perf_counter() < stop:
+            t = time.perf_counter()
+            client.detect(im)
+            out.append(time.perf_counter() - t)
+
+    threads = [threading.Thread(target=work, args=(out,)) for out in latencies]
+    t = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ms = np.concatenate([np.asarray(x) for x in latencies]) * 1e3
+    return len(ms) / (time.perf_counter() - t), ms
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, default="", help="running server, else one is started for the benchmark")
+    parser.add_argument("--weights", type=str, default=ROOT / "yolov5n.pt", help="model path for the started server")
+    parser.add_argument("--device", default="cpu", help="cuda device for the started server, i.e. 0 or cpu")
+    parser.add_argument("--port", type=int, default=8766, help="port for the started server")
+    parser.add_argument("--max-batch", type=int, default=16, help="most frames per forward pass of the started server")
+    parser.add_argument("--max-wait", type=float, default=0.005, help="batching window of the started server")
+    parser.add_argument("--image", type=str, default=ROOT / "captured_image.jpg", help="frame every client sends")
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 2, 4, 8, 16], help="concurrent client counts")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration per client count")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    server = None
+    if not opt.url:
+        opt.url = f"http://127.0.0.1:{opt.port}"
+        cmd = [sys.executable, str(ROOT / "pipeline/server.py"), "--weights", str(opt.weights), "--device", opt.device]
+        cmd += ["--port", str(opt.port), "--max-batch", str(opt.max_batch), "--max-wait", str(opt.max_wait)]
+        server = subprocess.Popen(cmd)
+    try:
+        client = connect(opt.url)
+        im = cv2.imread(str(opt.image))
+        bench(client, im, 1, 1.0)  # warm up connections and caches
+        for n in opt.clients:
+            rps, ms = bench(client, im, n, opt.seconds)
+            p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+            print(f"{n:>3} clients: {rps:7.1f} req/s, latency p50 {p50:7.1f}  p95 {p95:7.1f}  p99 {p99:7.1f} ms")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
@@ -0,0 +1,91 @@
+"""
+Compare buffered result sinks against the old per-box label appends.
+
+Counts file opens (each one is an open/write/close syscall triple at least) and wall time for a synthetic run.
+
+Usage:
+    $ python benchmarks/bench_sinks.py --frames 100000 --objects 5
+"""
+
+import argparse
+import builtins
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from sinks.results import CsvSink, JsonlSink, YoloTxtSink
+
+
+class OpenCounter:
+    """Count builtins.open calls while active"""
+
+    def __enter__(self):
+        self.count, self._open = 0, builtins.open
+
+        def counting_open(*args, **kwargs):
+            self.count += 1
+            return self._open(*args, **kwargs)
+
+        builtins.open = counting_open
+        return self
+
+    def __exit__(self, *args):
+        builtins.open = self._open
+
+
+def legacy(out, frames, boxes):
+    """The previous detect.py behaviour: open the label file in append mode for every box of every frame"""
+    gn = np.array([640, 480, 640, 480], dtype=np.float32)
+    for frame in range(frames):
+        for cls, b in enumerate(boxes):
+            xywh = np.concatenate(((b[:2] + b[2:]) / 2, b[2:] - b[:2])) / gn
+            line = (cls, *xywh.tolist())
+            with open(out / f"vid_{frame}.txt", "a") as f:
+                f.write(("%g " * len(line)).rstrip() % line + "\n")
+
+
+def buffered(out, frames, boxes, sink):
+    """Feed the same rows through a ResultSink"""
+    names = {i: str(i) for i in range(len(boxes))}
+    ids = classes = np.arange(len(boxes))
+    conf = np.full(len(boxes), 0.9, dtype=np.float32)
+    if sink == "txt":
+        s = YoloTxtSink(out, names)
+    elif sink == "csv":
+        s = CsvSink(out / "predictions.csv", names)
+    else:
+        s = JsonlSink(out / "predictions.jsonl", names)
+    for frame in range(frames):
+        s.add("vid.mp4", frame, (480, 640, 3), ids, classes, conf, boxes, label=f"vid_{frame}")
+    s.close()
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=100_000, help="frames to simulate")
+    parser.add_argument("--objects", type=int, default=5, help="confirmed objects per frame")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    xy = np.random.default_rng(0).uniform(0, 400, (opt.objects, 2)).astype(np.float32)
+    boxes = np.concatenate((xy, xy + 50), axis=1)
+    for name, fn in (
+        ("legacy txt", lambda out: legacy(out, opt.frames, boxes)),
+        ("sink txt", lambda out: buffered(out, opt.frames, boxes, "txt")),
+        ("sink csv", lambda out: buffered(out, opt.frames, boxes, "csv")),
+        ("sink jsonl", lambda out: buffered(out, opt.frames, boxes, "jsonl")),
+    ):
+        with tempfile.TemporaryDirectory() as d, OpenCounter() as counter:
+            t = time.perf_counter()
+            fn(Path(d))
+            dt = time.perf_counter() - t
+        print(f"{name:>11}: {counter.count:>9} opens, {dt:7.2f}s")
@@ -0,0 +1,79 @@
+"""
+Startup regression check for the voice assistants: time to a responsive assistant, against a budget.
+
+Each run imports the assistant module and constructs IntegratedVoiceAssistant in a fresh interpreter, which is all
+that happens before the keyboard listener starts. The check fails (exit code 1) if the median import + init time is
+over --budget-ms or if any heavy module (torch, cv2, numpy, pygame, ...) was imported on that path instead of on
+the warm-up thread.
+
+Usage:
+    $ python benchmarks/bench_startup.py --budget-ms 300
+"""
+
+import argparse
+import importlib
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+HEAVY = ("torch", "torchvision", "cv2", "numpy", "pandas", "pygame", "pyaudio", "edge_tts", "speech_recognition")
+
+
+def child(module):
+    """One start: import and construct, printed as JSON seconds plus the heavy modules that got imported"""
+    t0 = time.perf_counter()
+    m = importlib.import_module(module)
+    t1 = time.perf_counter()
+    m.IntegratedVoiceAssistant()
+    t2 = time.perf_counter()
+    heavy = [name for name in HEAVY if name in sys.modules]
+    print(json.dumps({"import": t1 - t0, "init": t2 - t1, "heavy": heavy}))
+
+
+def start(module):
+    """Run one start in a fresh interpreter, returns its timings including the process wall time"""
+    t = time.perf_counter()
+    cmd = [sys.executable, __file__, "--child", module]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=ROOT).stdout
+    wall = time.perf_counter() - t
+    return {**json.loads(out.strip().splitlines()[-1]), "wall": wall}
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=["teste_model_tts", "teste_model_tts_v2"], help="assistants")
+    parser.add_argument("--runs", type=int, default=5, help="starts per module")
+    parser.add_argument("--budget-ms", type=float, default=300, help="allowed median import + init time")
+    parser.add_argument("--child", type=str, default="", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    if opt.child:
+        child(opt.child)
+        sys.exit()
+    failures = []
+    for module in opt.modules:
+        runs = [start(module) for _ in range(opt.runs)]
+        ms = {k: statistics.median(r[k] for r in runs) * 1e3 for k in ("import", "init", "wall")}
+        ready = ms["import"] + ms["init"]
+        heavy = sorted({name for r in runs for name in r["heavy"]})
+        print(
+            f"{module:>20}: ready in {ready:6.0f} ms (import {ms['import']:6.0f}, init {ms['init']:5.0f}), "
+            f"process wall {ms['wall']:6.0f} ms, heavy modules: {', '.join(heavy) or 'none'}"
+        )
+        if ready > opt.budget_ms:
+            failures.append(f"{module} ready in {ready:.0f} ms, budget {opt.budget_ms:.0f} ms")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} before the keyboard listener starts")
+    for f in failures:
+        print(f"FAIL {f}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,108 @@
+"""
+Compare sliced (tiled) inference against plain inference at larger image sizes.
+
+For every mode reports ms per frame and, when YOLO-format labels are given, precision and recall at IoU 0.5 overall
+and for small objects (< 32x32 pixels in the original frame).
+
+Usage:
+    $ python benchmarks/bench_tiling.py --weights yolov5n.pt --source frames/ --labels labels/ --sizes 1280 1920
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from models.common import DetectMultiBackend
+from pipeline.tiling import merge_tiles, tile_batch, tile_origins
+from trackers.matching import box_iou, linear_assignment
+from utils.augmentations import letterbox
+from utils.general import check_img_size, non_max_suppression, scale_boxes
+from utils.torch_utils import select_device
+
+
+def load_labels(path, w, h):
+    """YOLO normalized xywh label file to (N, 5) [x1, y1, x2, y2, cls] pixels"""
+    if not path.exists():
+        return np.zeros((0, 5), dtype=np.float32)
+    cls, xywh = np.split(np.loadtxt(path, ndmin=2, dtype=np.float32)[:, :5], [1], axis=1)
+    xywh *= (w, h, w, h)
+    return np.concatenate((xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2, cls), axis=1)
+
+
+def detect(model, im0, imgsz, tile, opt):
+    """Run one frame, returns (N, 6) [x1, y1, x2, y2, conf, cls] in im0 pixels"""
+    im = letterbox(im0, imgsz, stride=model.stride, auto=model.pt)[0]
+    im = torch.from_numpy(np.ascontiguousarray(im.transpose((2, 0, 1))[::-1])).to(model.device)[None]
+    im = (im.half() if model.fp16 else im.float()) / 255
+    x = tile_batch(im, [im0], imgsz, opt.tile_overlap)[0] if tile else im
+    pred = non_max_suppression(model(x), opt.conf_thres, opt.iou_thres, max_det=opt.max_det)
+    if tile:
+        layouts = [tile_origins(*im0.shape[:2], imgsz, opt.tile_overlap)]
+        det = merge_tiles(pred, layouts, imgsz, im.shape[2:], [im0.shape], opt.iou_thres, opt.max_det)[0]
+    else:
+        det = pred[0]
+        det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape)
+    return det.cpu().numpy()
+
+
+def count_matches(det, gt, small=32**2):
+    """(true positives, detections, ground truths, small true positives, small ground truths) at IoU 0.5"""
+    iou = box_iou(gt[:, :4], det[:, :4]) * (gt[:, None, 4] == det[None, :, 5])
+    matches = linear_assignment(1 - iou, 0.5)[0]
+    is_small = np.prod(gt[:, 2:4] - gt[:, :2], axis=1) < small
+    return len(matches), len(det), len(gt), int(is_small[matches[:, 0]].sum()), int(is_small.sum())
+
+
+def bench(model, files, imgsz, tile, opt):
+    counts, times = np.zeros(5, dtype=np.int64), []
+    imgsz = check_img_size(imgsz, s=model.stride)
+    model.warmup(imgsz=(1, 3, *imgsz))
+    for f in files:
+        im0 = cv2.imread(str(f))
+        t = time.perf_counter()
+        det = detect(model, im0, imgsz, tile, opt)
+        times.append(time.perf_counter() - t)
+        if opt.labels:
+            gt = load_labels(Path(opt.labels) / f"{f.stem}.txt", im0.shape[1], im0.shape[0])
+            counts += count_matches(det, gt)
+    tp, nd, ng, stp, sng = counts
+    name = f"tiled {imgsz[0]}" if tile else f"plain {imgsz[0]}"
+    line = f"{name:>11}: {np.mean(times) * 1e3:8.1f} ms/frame"
+    if opt.labels:
+        line += f", P {tp / max(nd, 1):.3f}, R {tp / max(ng, 1):.3f}, small R {stp / max(sng, 1):.3f}"
+    print(line)
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default=ROOT / "yolov5n.pt", help="model path")
+    parser.add_argument("--source", type=str, required=True, help="directory of high-resolution images")
+    parser.add_argument("--labels", type=str, default="", help="directory of YOLO-format labels for accuracy")
+    parser.add_argument("--imgsz", type=int, default=640, help="tile size and plain baseline size")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1280, 1920], help="plain inference sizes to compare")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="overlap between tiles as a fraction")
+    parser.add_argument("--conf-thres", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--iou-thres", type=float, default=0.45, help="NMS IoU threshold")
+    parser.add_argument("--max-det", type=int, default=1000, help="maximum detections per image")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    files = sorted(p for p in Path(opt.source).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".bmp"))
+    model = DetectMultiBackend(opt.weights, device=select_device(opt.device))
+    with torch.no_grad():
+        bench(model, files, [opt.imgsz] * 2, False, opt)
+        bench(model, files, [opt.imgsz] * 2, True, opt)
+        for size in opt.sizes:
+            bench(model, files, [size] * 2, False, opt)
@@ -0,0 +1,94 @@
+"""
+Long-run memory check for ObjectTracker / TrackStore.
+
+Drives the tracker with objects that keep entering and leaving the scene and samples the current RSS along the way.
+A least-squares line is fitted to the samples after the first checkpoint, which covers warm-up. The line should be flat,
+so the script exits non-zero if it rises more than --tolerance MB over the run. This catches slow growth that a peak RSS
+reading would hide behind an early peak.
+
+Usage:
+    $ python benchmarks/bench_track_store.py --frames 1000000
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from detect import ObjectTracker
+
+
+def rss_mb():
+    """Current resident set size of this process in MB, from /proc on Linux and psutil elsewhere"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except OSError:
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 1024**2
+    except ImportError:
+        # Peak only, slow growth after an early peak goes unnoticed (ru_maxrss is KB on Linux, bytes on macOS)
+        print("WARNING ⚠️ psutil not installed, falling back to peak RSS")
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024**2 if sys.platform == "darwin" else rss / 1024
+
+
+def rss_slope(results):
+    """Least-squares RSS growth in MB per frame over the checkpoints after the first"""
+    frames, rss = np.array([(f, r) for f, r, _ in results[1:]], dtype=np.float64).T
+    return np.polyfit(frames, rss, 1)[0] if len(frames) > 1 else 0.0
+
+
+def run(n_frames, n_objects, lifetime, checkpoints):
+    """Feed n_frames of churning detections, returns [(frame, rss_mb, ms/frame)] per checkpoint"""
+    rng = np.random.default_rng(0)
+    tracker = ObjectTracker(frame_threshold=15, confidence_threshold=0.5)
+    xy = rng.uniform(0, 1800, (n_objects, 2)).astype(np.float32)
+    born = -rng.integers(0, lifetime, n_objects)
+    det = np.zeros((n_objects, 6), dtype=np.float32)
+    det[:, 5] = rng.integers(0, 80, n_objects)
+    results, t = [], time.perf_counter()
+    for frame_count in range(1, n_frames + 1):
+        # Objects live for `lifetime` frames then respawn elsewhere as new tracks
+        respawn = frame_count - born >= lifetime
+        xy[respawn] = rng.uniform(0, 1800, (int(respawn.sum()), 2))
+        born[respawn] = frame_count
+        xy += 1.0
+        det[:, :2], det[:, 2:4] = xy, xy + 48
+        det[:, 4] = 0.8
+        tracker.update(det, frame_count)
+        if frame_count % (n_frames // checkpoints) == 0:
+            results.append((frame_count, rss_mb(), (time.perf_counter() - t) / frame_count * 1e3))
+    return results
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=1_000_000, help="frames to simulate")
+    parser.add_argument("--objects", type=int, default=20, help="objects in view per frame")
+    parser.add_argument("--lifetime", type=int, default=300, help="frames an object stays in view")
+    parser.add_argument("--checkpoints", type=int, default=10, help="number of RSS samples")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed fitted RSS growth over the run (MB)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    results = run(opt.frames, opt.objects, opt.lifetime, opt.checkpoints)
+    for frame, rss, ms in results:
+        print(f"frame {frame:>9}: RSS {rss:8.1f} MB, {ms:.3f} ms/frame")
+    slope = rss_slope(results)
+    growth = slope * (results[-1][0] - results[0][0])
+    print(f"RSS slope after first checkpoint: {slope * 1e6:.3f} MB per million frames, {growth:.2f} MB over the run")
+    sys.exit(int(growth > opt.tolerance))
@@ -0,0 +1,85 @@
+"""
+Microbenchmark for the tracker association step.
+
+Usage:
+    $ python benchmarks/bench_tracker.py --objects 10 100 1000 --frames 200
+    $ python benchmarks/bench_tracker.py --tracker byte
+    $ python benchmarks/bench_tracker.py --objects 50 --streams 1 2 4 8 16
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from detect import ObjectTracker
+from trackers.byte_tracker import BYTETracker
+
+
+def synthetic_frames(n_objects, n_frames, n_classes=80, size=1920, seed=0):
+    """Yield (n, 6) detection arrays for boxes drifting slowly across the frame"""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, size - 64, (n_objects, 2)).astype(np.float32)
+    wh = rng.uniform(16, 64, (n_objects, 2)).astype(np.float32)
+    vel = rng.uniform(-2, 2, (n_objects, 2)).astype(np.float32)
+    cls = rng.integers(0, n_classes, n_objects).astype(np.float32)
+    for _ in range(n_frames):
+        xy = np.clip(xy + vel, 0, size - 64)
+        conf = rng.uniform(0.4, 1.0, n_objects).astype(np.float32)
+        yield np.concatenate((xy, xy + wh, conf[:, None], cls[:, None]), axis=1)
+
+
+def bench(n_objects, n_frames, tracker="simple"):
+    """Return mean ms/frame spent in the tracker update"""
+    frames = list(synthetic_frames(n_objects, n_frames))
+    if tracker == "byte":
+        byte_tracker = BYTETracker(track_thresh=0.5, track_buffer=30, match_thresh=0.8)
+        t = time.perf_counter()
+        for det in frames:
+            byte_tracker.update(det)
+        return (time.perf_counter() - t) / n_frames * 1e3
+
+    object_tracker = ObjectTracker(frame_threshold=15, confidence_threshold=0.5)
+    t = time.perf_counter()
+    for frame_count, det in enumerate(frames, 1):
+        object_tracker.update(det, frame_count)
+    return (time.perf_counter() - t) / n_frames * 1e3
+
+
+def bench_streams(n_objects, n_frames, n_streams):
+    """Return mean ms/batch for n_streams sources tracked in one ObjectTracker.update_batch call"""
+    streams = [list(synthetic_frames(n_objects, n_frames, seed=i)) for i in range(n_streams)]
+    object_tracker = ObjectTracker(frame_threshold=15, confidence_threshold=0.5)
+    frame_counts = np.zeros(n_streams, dtype=np.int64)
+    t = time.perf_counter()
+    for batch in zip(*streams):
+        frame_counts += 1
+        object_tracker.update_batch(batch, frame_counts)
+    return (time.perf_counter() - t) / n_frames * 1e3
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--objects", nargs="+", type=int, default=[10, 100, 1000], help="objects per frame")
+    parser.add_argument("--frames", type=int, default=200, help="frames per run")
+    parser.add_argument("--tracker", type=str, default="simple", choices=["simple", "byte"], help="object tracker")
+    parser.add_argument("--streams", nargs="+", type=int, help="benchmark batched multi-stream tracking instead")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    if opt.streams:
+        for n in opt.objects:
+            for k in opt.streams:
+                ms = bench_streams(n, opt.frames, k)
+                print(f"{n:>6} objects x {k:>3} streams: {ms:8.3f} ms/batch ({ms / k:.3f} ms/stream)")
+        sys.exit()
+    for n in opt.objects:
+        print(f"{n:>6} objects: {bench(n, opt.frames, opt.tracker):8.3f} ms/frame")
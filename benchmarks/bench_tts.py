@@ -0,0 +1,110 @@
+"""
+TTS latency check: phrase cache hit rate and time to first audio on hits versus misses, and streaming first audio.
+
+Every prompt of the --scripts is spoken --rounds times through a PhraseCache with an empty cache directory, on the
+assistants' engine chain after its latency probe. The first round is all misses, synthesized by the fastest engine.
+Later rounds are memory hits, and a fresh cache on the same directory measures disk hits, which is what a restarted
+assistant sees. Time to first audio is the time until the audio is ready to hand to the player, playback itself is not
+included, and hit rates are cumulative per cache.
+
+With --streaming, a short and a long text are synthesized --rounds times each, uncached, by every installed engine
+(Edge, Piper, eSpeak NG, pyttsx3). For each one the check reports the time to the first chunk, which is when
+StreamPlayer starts decoding, and the time to the whole sentence, which is when playback used to start. Run it without
+network to see what the assistants fall back to.
+
+Usage:
+    $ python benchmarks/bench_tts.py --scripts teste_model_tts.py best_tts_stt.py --rounds 3
+    $ python benchmarks/bench_tts.py --streaming
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from pipeline.tts import PhraseCache, static_prompts
+from pipeline.tts_backends import default_backend
+
+SHORT = "Fotografia capturada!"
+LONG = (
+    "Detetei 6 objetos: pessoa com 91% de confiança, cadeira com 84% de confiança, mesa com 77% de confiança, "
+    "computador portátil com 72% de confiança, garrafa com 58% de confiança, chávena com 41% de confiança"
+)
+
+
+async def speak_all(cache, prompts):
+    """Time to first audio of every prompt, in milliseconds, split into hits and misses"""
+    ms = {"hit": [], "miss": []}
+    for text in prompts:
+        t = time.perf_counter()
+        _, hit = await cache.synthesize(text)
+        ms["hit" if hit else "miss"].append((time.perf_counter() - t) * 1e3)
+    return ms
+
+
+async def first_audio(backend, text):
+    """(ms to the first chunk, ms to the whole sentence) of one uncached synthesis"""
+    t = time.perf_counter()
+    first = None
+    async for _ in backend.stream(text):
+        first = first or time.perf_counter()
+    end = time.perf_counter()
+    return ((first or end) - t) * 1e3, (end - t) * 1e3
+
+
+def report(name, cache, ms):
+    parts = [f"{name:>12}: {cache.hit_rate:4.0%} hit rate"]
+    for kind in ("hit", "miss"):
+        if ms[kind]:
+            parts.append(f"{kind} {statistics.median(ms[kind]):8.2f} ms median over {len(ms[kind])}")
+    print(", ".join(parts))
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scripts", nargs="+", default=["teste_model_tts.py"], help="files to take the prompts from")
+    parser.add_argument("--voice", type=str, default="pt-PT-RaquelNeural", help="Edge TTS voice")
+    parser.add_argument("--rounds", type=int, default=3, help="times every prompt is spoken")
+    parser.add_argument("--max-items", type=int, default=64, help="in-memory LRU size")
+    parser.add_argument("--streaming", action="store_true", help="measure streaming first audio instead")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    chain = default_backend(opt.voice)
+    if opt.streaming:
+        for backend in chain.backends:
+            for name, text in (("short", SHORT), ("long", LONG)):
+                try:
+                    ms = [asyncio.run(first_audio(backend, text)) for _ in range(opt.rounds)]
+                except Exception as e:
+                    print(f"{backend.name:>8} {name:>5}: failed, {type(e).__name__} {e}")
+                    break
+                first, whole = (statistics.median(x) for x in zip(*ms))
+                print(
+                    f"{backend.name:>8} {name:>5} ({len(text):3d} chars): first chunk {first:7.1f} ms, "
+                    f"whole sentence {whole:7.1f} ms"
+                )
+        sys.exit()
+    chain.probe()
+    print(f"TTS engines: {chain.summary()}")
+    prompts = list(dict.fromkeys(p for script in opt.scripts for p in static_prompts(ROOT / script)))
+    print(f"{len(prompts)} prompts from {', '.join(opt.scripts)}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PhraseCache(chain, tmp, max_items=opt.max_items)
+        total = {"hit": [], "miss": []}
+        for r in range(opt.rounds):
+            ms = asyncio.run(speak_all(cache, prompts))
+            total = {k: total[k] + ms[k] for k in total}
+            report(f"round {r + 1}", cache, ms)
+        report("memory", cache, total)
+        restarted = PhraseCache(chain, tmp, max_items=opt.max_items)
+        report("disk", restarted, asyncio.run(speak_all(restarted, prompts)))
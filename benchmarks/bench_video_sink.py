@@ -0,0 +1,65 @@
+"""
+Frame-loop FPS with MP4 encoding off, inline (the previous detect.py behaviour) and on the VideoSink thread.
+
+Inference is simulated with a sleep, which like a torch forward pass releases the GIL.
+
+Usage:
+    $ python benchmarks/bench_video_sink.py --frames 300 --infer-ms 15 --imgsz 1080 1920
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from sinks.video import VideoSink
+
+
+def bench(mode, frames, infer_ms, h, w, out):
+    """Return (fps, encoded, dropped) for one mode: 'off', 'inline' or 'async'"""
+    base = np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    path = str(out / f"{mode}.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (w, h)) if mode == "inline" else None
+    sink = VideoSink() if mode == "async" else None
+    if sink:
+        sink.open(0, path, 30, (w, h))
+    t = time.perf_counter()
+    for i in range(frames):
+        time.sleep(infer_ms / 1e3)  # inference
+        im0 = np.roll(base, i * 4, axis=1)  # a moving frame, new array each time like annotator.result()
+        if writer:
+            writer.write(im0)
+        elif sink:
+            sink.write(0, im0)
+    fps = frames / (time.perf_counter() - t)  # frame loop only, the sink drains on its own thread
+    if writer:
+        writer.release()
+        return fps, frames, 0
+    if sink:
+        sink.close()
+        return fps, sink.handled, sink.dropped
+    return fps, 0, 0
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300, help="frames to process")
+    parser.add_argument("--infer-ms", type=float, default=15.0, help="simulated inference time per frame")
+    parser.add_argument("--imgsz", nargs=2, type=int, default=[1080, 1920], help="frame height width")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    with tempfile.TemporaryDirectory() as d:
+        for mode in ("off", "inline", "async"):
+            fps, encoded, dropped = bench(mode, opt.frames, opt.infer_ms, *opt.imgsz, Path(d))
+            print(f"encoding {mode:>6}: {fps:6.1f} FPS, {encoded} encoded, {dropped} dropped")
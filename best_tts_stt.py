@@ -3,10 +3,9 @@ from pynput import keyboard
 import threading
 import time
 import pyaudio
-import edge_tts
-import asyncio
-import pygame
-import io
+
+from pipeline.tts import NORMAL, URGENT, PhraseCache, SpeechWorker, static_prompts
+from pipeline.tts_backends import default_backend
 
 class VoiceAssistant:
     def __init__(self):
@@ -28,41 +27,32 @@ class VoiceAssistant:
         self.voice = "pt-PT-RaquelNeural"  # European Portuguese female voice
         # Alternative voices: "pt-PT-DuarteNeural" (male)
         
-        # Initialize pygame for audio playback
-        pygame.mixer.init()
+        # Synthesized phrases are cached in memory and on disk, the fixed prompts are synthesized in the background,
+        # and spoken in priority order by one long-lived worker that owns the playback device, speak() only queues
+        self.tts_backend = default_backend(self.voice)  # Edge, Piper, eSpeak NG, pyttsx3, fastest first once probed
+        self.tts_cache = PhraseCache(self.tts_backend)
+        self.speech = SpeechWorker(self.tts_cache)
+        threading.Thread(target=self._prewarm_tts, name="tts-prewarm", daemon=True).start()
         
         print("Voice assistant initialized with European Portuguese TTS!")
 
-    def speak(self, text):
-        """Convert text to speech using Edge TTS"""
-        async def _speak():
-            try:
-                communicate = edge_tts.Communicate(text, self.voice)
-                
-                # Create audio data in memory
-                audio_data = io.BytesIO()
-                async for chunk in communicate.stream():
-                    if chunk["type"] == "audio":
-                        audio_data.write(chunk["data"])
-                
-                # Reset position to beginning
-                audio_data.seek(0)
-                
-                # Play audio using pygame
-                pygame.mixer.music.load(audio_data)
-                pygame.mixer.music.play()
-                
-                # Wait for playback to finish
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
-            except Exception as e:
-                print(f"TTS Error: {e}")
-        
-        # Run the async function
+    def speak(self, text, wait=False, status=False, urgent=False):
+        """Queue text on the speech worker, with wait=True return only once it has been spoken"""
+        future = self.speech.say(text, URGENT if urgent else NORMAL, status)
+        if wait:
+            future.result()
+        return future
+
+    def _prewarm_tts(self):
+        """Order the TTS engines by latency, then synthesize the fixed prompts of this file that are not cached yet"""
         try:
-            asyncio.run(_speak())
+            self.tts_backend.probe()
+            print(f"🔊 TTS engines: {self.tts_backend.summary()}")
+            n = self.tts_cache.prewarm(static_prompts(__file__))
+            if n:
+                print(f"🔊 {n} prompts synthesized and cached")
         except Exception as e:
-            print(f"Speech synthesis error: {e}")
+            print(f"TTS pre-warm error: {e}")
 
     def on_key_press(self, key):
         """Handle key press events from pynput"""
@@ -87,7 +77,7 @@ class VoiceAssistant:
             return
         
         print("🔴 Starting 5-second recording...")
-        self.speak("A iniciar gravação de 5 segundos.")
+        self.speak("A iniciar gravação de 5 segundos.", wait=True)
         self._start_5_second_recording()
 
     def _start_5_second_recording(self):
@@ -182,7 +172,7 @@ class VoiceAssistant:
     def _handle_command(self, command):
         """Handle voice commands"""
         if any(word in command for word in ["sair", "parar", "terminar", "adeus", "tchau"]):
-            self.speak("Adeus!")
+            self.speak("Adeus!", wait=True)
             return "exit"
         elif any(word in command for word in ["teu nome", "quem és", "nome", "quem es"]):
             self.speak("Sou o teu assistente de voz em Python.")
@@ -246,6 +236,8 @@ def main():
             if assistant.is_recording:
                 assistant.is_recording = False
             listener.stop()
+            assistant.speech.close()
+            print(f"🔊 TTS cache: {assistant.tts_cache.summary()}, {assistant.speech.summary()}")
             
     except Exception as e:
         print(f"\n❌ Erro fatal: {e}")
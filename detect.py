@@ -29,13 +29,12 @@ Usage - formats:
 """
 
 import argparse
-import csv
 import os
-import platform
 import sys
+import time
 from pathlib import Path
-from collections import defaultdict
 
+import numpy as np
 import torch
 
 FILE = Path(__file__).resolve()
@@ -44,9 +43,22 @@ if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))  # add ROOT to PATH
 ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
 
-from ultralytics.utils.plotting import Annotator, colors, save_one_box
+from ultralytics.utils.plotting import Annotator, colors
 
 from models.common import DetectMultiBackend
+from pipeline.batching import collate, item_slice
+from pipeline.metrics import PrometheusMetrics
+from pipeline.motion import MotionGate, tensor_thumbnail
+from pipeline.scheduler import FrameScheduler
+from pipeline.server import DetectionClient
+from pipeline.threaded import Pipeline
+from pipeline.tiling import merge_tiles, tile_batch, tile_origins
+from sinks.crops import CropManager
+from sinks.results import CsvSink, JsonlSink, MultiSink, ParquetSink, YoloTxtSink
+from sinks.video import PreviewSink, VideoSink
+from trackers.byte_tracker import BYTETracker
+from trackers.matching import associate
+from trackers.track_store import TrackStore
 from utils.dataloaders import IMG_FORMATS, VID_FORMATS, LoadImages, LoadScreenshots, LoadStreams
 from utils.general import (
     LOGGER,
@@ -62,97 +74,110 @@ from utils.general import (
     print_args,
     scale_boxes,
     strip_optimizer,
-    xyxy2xywh,
 )
 from utils.torch_utils import select_device, smart_inference_mode
 
+STREAM_KEY = 1 << 20  # stream index offset in the association key, larger than any class index
+
+
 class ObjectTracker:
-    def __init__(self, frame_threshold=15, confidence_threshold=0.5):
-        self.tracked_objects = defaultdict(dict)
+    def __init__(self, frame_threshold=15, confidence_threshold=0.5, iou_threshold=0.5):
+        self.store = TrackStore()
+        self.frame_counts = np.zeros(0, dtype=np.int64)  # latest frame count of every stream
         self.frame_threshold = frame_threshold
         self.confidence_threshold = confidence_threshold
-        self.next_id = 0
+        self.iou_threshold = iou_threshold
     
     def update(self, detections, frame_count):
         """Update tracked objects with new detections"""
-        active_ids = set()
-        
-        # Process current detections
-        for *xyxy, conf, cls in detections:
-            cls = int(cls)
-            conf = float(conf)
-            
-            if conf < self.confidence_threshold:
-                continue
-                
-            # Find if this detection matches an existing tracked object
-            matched = False
-            for obj_id, obj_data in self.tracked_objects.items():
-                if obj_data['class'] == cls:
-                    # Simple overlap check (could be improved with IoU)
-                    prev_xyxy = obj_data['last_bbox']
-                    current_xyxy = xyxy
-                    overlap = self.calculate_overlap(prev_xyxy, current_xyxy)
-                    
-                    if overlap > 0.5:  # If overlap is more than 50%
-                        matched = True
-                        obj_data['last_bbox'] = xyxy
-                        obj_data['last_seen'] = frame_count
-                        obj_data['confidence_history'].append(conf)
-                        active_ids.add(obj_id)
-                        break
-            
-            # If no match found and confidence is high enough, create new tracked object
-            if not matched and conf >= self.confidence_threshold:
-                obj_id = self.next_id
-                self.tracked_objects[obj_id] = {
-                    'class': cls,
-                    'last_bbox': xyxy,
-                    'first_seen': frame_count,
-                    'last_seen': frame_count,
-                    'confidence_history': [conf],
-                    'confirmed': False
-                }
-                active_ids.add(obj_id)
-                self.next_id += 1
-        
-        # Check which objects should be confirmed
-        for obj_id in active_ids:
-            obj_data = self.tracked_objects[obj_id]
-            if not obj_data['confirmed']:
-                # Check if we have enough consecutive frames with high confidence
-                if (frame_count - obj_data['first_seen'] + 1) >= self.frame_threshold:
-                    # Calculate average confidence over the tracking period
-                    avg_conf = sum(obj_data['confidence_history']) / len(obj_data['confidence_history'])
-                    if avg_conf >= self.confidence_threshold:
-                        obj_data['confirmed'] = True
-        
-        # Remove objects that haven't been seen for a while
-        to_delete = [obj_id for obj_id, obj_data in self.tracked_objects.items() 
-                    if (frame_count - obj_data['last_seen']) > self.frame_threshold]
-        for obj_id in to_delete:
-            del self.tracked_objects[obj_id]
+        self.update_batch([detections], [frame_count])
     
-    def calculate_overlap(self, box1, box2):
-        """Calculate overlap area between two bounding boxes"""
-        x1 = max(box1[0], box2[0])
-        y1 = max(box1[1], box2[1])
-        x2 = min(box1[2], box2[2])
-        y2 = min(box1[3], box2[3])
+    def _advance(self, frame_counts):
+        """Record the current frame count of the first len(frame_counts) streams"""
+        frame_counts = np.asarray(frame_counts, dtype=np.int64)
+        if len(frame_counts) > len(self.frame_counts):
+            self.frame_counts = np.concatenate(
+                (self.frame_counts, np.zeros(len(frame_counts) - len(self.frame_counts), dtype=np.int64))
+            )
+        self.frame_counts[: len(frame_counts)] = frame_counts
+        return frame_counts
+
+    def predict_batch(self, frame_counts):
+        """
+        Advance streams to frame_counts on a frame that was not run through the detector.
+
+        Tracks are neither matched nor aged out, `get_confirmed_objects` extrapolates them along their velocity. Frame
+        counts keep increasing on skipped frames, so the confirmation and removal windows still count real frames.
+        """
+        self._advance(frame_counts)
+
+    def update_batch(self, detections, frame_counts):
+        """
+        Update tracks of several independent streams in one pass.
+
+        detections[i] holds the (N, 6) detections of stream i and frame_counts[i] its own frame counter. Tracks only
+        ever match detections of the same stream and class.
+        """
+        dets = [d.cpu().numpy() if isinstance(d, torch.Tensor) else d for d in detections]
+        stream = np.repeat(np.arange(len(dets)), [len(d) for d in dets])
+        detections = np.concatenate([np.asarray(d, dtype=np.float32).reshape(-1, 6) for d in dets])
+        keep = detections[:, 4] >= self.confidence_threshold
+        detections, stream = detections[keep], stream[keep]
+        frame_counts = self._advance(frame_counts)
+        store = self.store
+        
+        # Match all detections against the motion-predicted tracks of the same stream and class in one pass
+        live = store.live
+        frames = self.frame_counts[store.stream[live]]
+        track_key = store.stream[live] * STREAM_KEY + store.cls[live]
+        det_key = stream * STREAM_KEY + detections[:, 5].astype(np.int64)
+        predicted = store.predict(live, frames)
+        matches, u_track, u_det = associate(predicted, track_key, detections[:, :4], det_key, self.iou_threshold)
+
+        # Tracks not seen on the previous frame (missed or skipped frames) get a second chance at half the IoU, their
+        # predicted position is less certain
+        stale = u_track[frames[u_track] - store.last_seen[live[u_track]] > 1]
+        m2, u2 = np.empty((0, 2), dtype=np.int64), np.arange(len(u_det))
+        if len(stale) and len(u_det):
+            m2, _, u2 = associate(
+                predicted[stale], track_key[stale], detections[u_det, :4], det_key[u_det], self.iou_threshold / 2
+            )
+        t = np.concatenate((matches[:, 0], stale[m2[:, 0]]))
+        d = np.concatenate((matches[:, 1], u_det[m2[:, 1]]))
+        matched = live[t]
+        store.observe(matched, detections[d, :4], detections[d, 4], frame_counts[stream[d]])
         
-        if x2 < x1 or y2 < y1:
-            return 0.0
+        # Unmatched detections start new tracked objects
+        d = u_det[u2]
+        added = store.add(
+            detections[d, :4], detections[d, 4], detections[d, 5].astype(np.int64), frame_counts[stream[d]], stream[d]
+        )
         
-        intersection = (x2 - x1) * (y2 - y1)
-        area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
-        area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
+        # Confirm active objects seen for enough frames with a high enough average confidence
+        active = np.concatenate((matched, added))
+        ready = (frame_counts[store.stream[active]] - store.first_seen[active] + 1) >= self.frame_threshold
+        ready &= store.mean_conf[active] >= self.confidence_threshold
+        store.confirmed[active[ready]] = True
         
-        return intersection / min(area1, area2)
+        # Remove objects that haven't been seen for a while, only streams in this batch advance
+        live = store.live
+        live = live[store.stream[live] < len(frame_counts)]
+        store.remove(live[(frame_counts[store.stream[live]] - store.last_seen[live]) > self.frame_threshold])
     
-    def get_confirmed_objects(self):
-        """Return only confirmed objects"""
-        return {obj_id: obj_data for obj_id, obj_data in self.tracked_objects.items() 
-               if obj_data['confirmed']}
+    def get_confirmed_objects(self, stream=0):
+        """
+        Confirmed objects of one stream as one (M, 7) float64 array of [x1, y1, x2, y2, track_id, avg_conf, cls].
+
+        Same layout as BYTETracker output, so everything downstream handles both trackers with array operations. float64
+        holds every track id exactly up to 2**53, float32 would start merging ids past 2**24.
+        """
+        store = self.store
+        slots = np.nonzero(store.alive & store.confirmed & (store.stream == stream))[0]
+        frame = self.frame_counts[stream] if stream < len(self.frame_counts) else store.last_seen[slots]
+        # A new array, so the result stays valid while the tracker moves on to the next frame
+        return np.column_stack(
+            (store.predict(slots, frame), store.track_id[slots], store.mean_conf[slots], store.cls[slots])
+        ).astype(np.float64)
 
 
 @smart_inference_mode()
@@ -169,8 +194,11 @@ def run(
     save_txt=False,  # save results to *.txt
     save_format=0,  # save boxes coordinates in YOLO format or Pascal-VOC format (0 for YOLO and 1 for Pascal-VOC)
     save_csv=False,  # save results in CSV format
+    save_jsonl=False,  # save results in JSON Lines format
+    save_parquet=False,  # save results in Parquet format (requires pyarrow)
     save_conf=False,  # save confidences in --save-txt labels
     save_crop=False,  # save cropped prediction boxes
+    crop_refresh=0,  # with save_crop, also rewrite improved crops every N frames (0: only when the track ends)
     nosave=False,  # do not save images/videos
     classes=None,  # filter by class: --class 0, or --class 0 2 3
     agnostic_nms=False,  # class-agnostic NMS
@@ -186,6 +214,18 @@ def run(
     half=False,  # use FP16 half-precision inference
     dnn=False,  # use OpenCV DNN for ONNX inference
     vid_stride=1,  # video frame-rate stride
+    target_fps=0,  # per-frame latency budget, skip detection on frames that would exceed it (0: detect every frame)
+    max_stride=8,  # with target_fps, run the detector at least every max_stride frames
+    motion_gate=False,  # skip detection on frames where nothing changed, carrying the last detections forward
+    motion_thresh=0.002,  # with motion_gate, fraction of the downsampled frame that must change to run detection
+    tile=False,  # sliced inference, run overlapping imgsz tiles of the original frame next to the full view
+    tile_overlap=0.2,  # with tile, overlap between neighbouring tiles as a fraction of the tile size
+    batch_size=1,  # images or consecutive video frames per forward pass for file sources
+    recorder=None,  # optional pipeline.metrics recorder for per-stage latencies and counters
+    metrics_port=0,  # serve Prometheus metrics on http://127.0.0.1:<port>/metrics (0: off)
+    server="",  # URL of a resident pipeline/server.py to detect with instead of loading the model here
+    tracker="simple",  # object tracker, simple (IoU + confirmation window) or byte (ByteTrack)
+    pipeline=False,  # run capture, inference, NMS/tracking and rendering on separate threads
 ):
     """
     Runs YOLOv5 detection inference on various sources like images, videos, directories, streams, etc.
@@ -204,8 +244,12 @@ def run(
         view_img (bool): If True, display inference results using OpenCV. Default is False.
         save_txt (bool): If True, save results in a text file. Default is False.
         save_csv (bool): If True, save results in a CSV file. Default is False.
+        save_jsonl (bool): If True, save results in a JSON Lines file. Default is False.
+        save_parquet (bool): If True, save results in a Parquet file (requires pyarrow). Default is False.
         save_conf (bool): If True, include confidence scores in the saved results. Default is False.
-        save_crop (bool): If True, save cropped prediction boxes. Default is False.
+        save_crop (bool): If True, save the best crop of every confirmed track. Default is False.
+        crop_refresh (int): With save_crop, rewrite a track's crop every N frames if a better one was seen, 0 writes
+            it only when the track ends. Default is 0.
         nosave (bool): If True, do not save inference images or videos. Default is False.
         classes (list[int]): List of class indices to filter detections by. Default is None.
         agnostic_nms (bool): If True, perform class-agnostic non-max suppression. Default is False.
@@ -222,6 +266,32 @@ def run(
         half (bool): If True, use FP16 half-precision inference. Default is False.
         dnn (bool): If True, use OpenCV DNN backend for ONNX inference. Default is False.
         vid_stride (int): Stride for processing video frames, to skip frames between processing. Default is 1.
+        target_fps (float): Frame rate to keep up with. Measured Profile timings decide which frames get full
+            detection, the tracker's motion prediction covers the others. 0 detects every frame. Default is 0.
+        max_stride (int): With target_fps, the most frames between two detections. Default is 8.
+        motion_gate (bool): If True, compare a downsampled grayscale version of the letterboxed input with the last
+            detected frame and skip the detector on static frames, feeding the last detections to the tracker instead.
+            Default is False.
+        motion_thresh (float): With motion_gate, fraction of thumbnail cells that must change. Default is 0.002.
+        tile (bool): If True, cut each original frame into overlapping tiles of imgsz and run them in one batch with
+            the letterboxed full view, then merge with a cross-tile NMS. Finds small objects in high-resolution
+            frames without raising imgsz. Default is False.
+        tile_overlap (float): With tile, overlap between neighbouring tiles as a fraction of the tile. Default is 0.2.
+        batch_size (int): For image and video file sources, number of images or consecutive frames collated into one
+            forward pass. NMS, tracking and saving still run per image, in order. Default is 1.
+        recorder (StageRecorder | None): Receives per-stage latencies (capture, preprocess, inference, nms, track,
+            annotate, write) through `observe(stage, seconds)`, counters through `inc` (frames, dropped_frames) and
+            gauges through `set` (active_tracks, queue_depth). Default is None.
+        metrics_port (int): If > 0 and no recorder is passed, serve these metrics in Prometheus text format on
+            http://127.0.0.1:<port>/metrics while the run lasts. Default is 0.
+        server (str): URL of a running pipeline/server.py, e.g. 'http://127.0.0.1:8765'. Frames are sent there and
+            come back as NMS'd detections, batched with those of other clients, and no model is loaded in this
+            process. weights, half, dnn, augment and visualize then have no effect. Default is '' (local model).
+        tracker (str): Object tracker, 'simple' for the IoU tracker with a confirmation window or 'byte' for ByteTrack.
+            Default is 'simple'.
+        pipeline (bool): If True, run capture/letterbox, inference, NMS+tracking and render/save as a pipeline of
+            threads connected by bounded queues. Live sources drop the oldest queued frame, files apply backpressure.
+            Default is False.
 
     Returns:
         None
@@ -252,8 +322,13 @@ def run(
 
     # Load model
     device = select_device(device)
-    model = DetectMultiBackend(weights, device=device, dnn=dnn, data=data, fp16=half)
-    stride, names, pt = model.stride, model.names, model.pt
+    if server:  # detections come from the shared server, which letterboxes the original frames itself
+        assert not tile, "--tile needs a local model, it cannot be combined with --server"
+        client, model = DetectionClient(server), None
+        stride, names, pt, fp16 = client.stride, client.names, False, False
+    else:
+        client, model = None, DetectMultiBackend(weights, device=device, dnn=dnn, data=data, fp16=half)
+        stride, names, pt, fp16 = model.stride, model.names, model.pt, model.fp16
     imgsz = check_img_size(imgsz, s=stride)  # check image size
 
     # Dataloader
@@ -265,117 +340,208 @@ def run(
     elif screenshot:
         dataset = LoadScreenshots(source, img_size=imgsz, stride=stride, auto=pt)
     else:
-        dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=pt, vid_stride=vid_stride)
-    vid_path, vid_writer = [None] * bs, [None] * bs
-
-    # Initialize the tracker
-    tracker = ObjectTracker(frame_threshold=15, confidence_threshold=0.5)
-    frame_count = 0
+        # Batched items have to share one shape, so they are padded to the full imgsz
+        auto = pt and batch_size == 1
+        dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=auto, vid_stride=vid_stride)
+    batched = batch_size > 1 and not (webcam or screenshot)  # collated file source, lists of bs=1 items
+    vid_path = [None] * bs
+
+    # Initialize the tracker, per-stream state for batched sources
+    if tracker == "byte":
+        object_tracker = [BYTETracker(track_thresh=0.5, track_buffer=30, match_thresh=0.8) for _ in range(bs)]
+    else:
+        object_tracker = ObjectTracker(frame_threshold=15, confidence_threshold=0.5)
+    frame_counts = np.zeros(bs, dtype=np.int64)
+
+    # Result sinks
+    sinks = MultiSink()
+    if save_txt:
+        sinks.sinks.append(YoloTxtSink(save_dir / "labels", names, save_format=save_format, save_conf=save_conf))
+    if save_csv:
+        sinks.sinks.append(CsvSink(save_dir / "predictions.csv", names))
+    if save_jsonl:
+        sinks.sinks.append(JsonlSink(save_dir / "predictions.jsonl", names))
+    if save_parquet:
+        check_requirements("pyarrow")
+        sinks.sinks.append(ParquetSink(save_dir / "predictions.parquet", names))
+    video = VideoSink() if save_img else None  # MP4 encoding off the frame loop
+    preview = PreviewSink() if view_img else None
+    gate = MotionGate(min_area=motion_thresh) if motion_gate else None
+    scheduler = FrameScheduler(1 / target_fps, max_stride=max_stride) if target_fps else None
+    crops = CropManager(save_dir / "crops", names, refresh_interval=crop_refresh) if save_crop else None
 
     # Run inference
-    model.warmup(imgsz=(1 if pt or model.triton else bs, 3, *imgsz))  # warmup
-    seen, windows, dt = 0, [], (Profile(device=device), Profile(device=device), Profile(device=device))
-    for path, im, im0s, vid_cap, s in dataset:
-        frame_count += 1
+    if model:
+        model.warmup(imgsz=(1 if pt or model.triton else bs, 3, *imgsz))  # warmup
+    metrics = PrometheusMetrics().serve(metrics_port) if metrics_port and recorder is None else None
+    recorder = recorder or metrics
+    pipe, dropped = None, {}  # the threaded pipeline if any, frames dropped per queue as last reported
+    skipped = {"static": 0, "skip": 0}  # images that did not go through the detector
+    last_dets = None  # detections carried forward over static frames
+    seen, dt = 0, (Profile(device=device), Profile(device=device), Profile(device=device))
+
+    def preprocess(path, im, im0s, vid_cap, s, frame=None, mode=None):
+        """Capture stage: the dataloader has already read and letterboxed the batch, move it to the device"""
+        if frame is None:  # collated batches carry the frame index and mode of every item
+            frame = dataset.count if webcam else getattr(dataset, "frame", 0)
+            mode = dataset.mode  # read now, later stages may run after the loader moved on to a video
         with dt[0]:
-            im = torch.from_numpy(im).to(model.device)
-            im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
+            im = torch.from_numpy(im).to(device)
+            im = im.half() if fp16 else im.float()  # uint8 to fp16/32
             im /= 255  # 0 - 255 to 0.0 - 1.0
             if len(im.shape) == 3:
                 im = im[None]  # expand for batch dim
-            if model.xml and im.shape[0] > 1:
-                ims = torch.chunk(im, im.shape[0], 0)
-
-        # Inference
+        if recorder is not None:
+            recorder.observe("preprocess", dt[0].dt)
+        return path, im, im0s, vid_cap, s, frame, mode
+
+    def inference(path, im, im0s, vid_cap, s, frame, mode):
+        nonlocal visualize
+        thumb = tensor_thumbnail(im) if gate else None  # reuses the letterboxed tensor
+        if gate and not gate.changed(thumb):
+            return path, im, im0s, vid_cap, s, frame, mode, None, "static"  # nothing moved, carry the last detections
+        if scheduler and not scheduler.should_detect():
+            return path, im, im0s, vid_cap, s, frame, mode, None, "skip"  # over budget, the tracker predicts this frame
+        if gate:
+            gate.update(thumb)
         with dt[1]:
             visualize = increment_path(save_dir / Path(path).stem, mkdir=True) if visualize else False
-            if model.xml and im.shape[0] > 1:
+            x = im
+            if tile:  # full views and native-resolution tiles in one batch, merged again in postprocess
+                x = tile_batch(im, im0s if webcam or batched else [im0s], imgsz, tile_overlap)[0]
+            if client:  # NMS'd detections in im0 pixels, batched on the server with those of other clients
+                ims = im0s if webcam or batched else [im0s]
+                pred = client.detect_batch(ims, conf_thres, iou_thres, classes, max_det, agnostic_nms)
+                pred = [torch.from_numpy(det).to(device) for det in pred]
+            elif model.xml and x.shape[0] > 1:
                 pred = None
-                for image in ims:
+                for image in torch.chunk(x, x.shape[0], 0):
                     if pred is None:
                         pred = model(image, augment=augment, visualize=visualize).unsqueeze(0)
                     else:
                         pred = torch.cat((pred, model(image, augment=augment, visualize=visualize).unsqueeze(0)), dim=0)
                 pred = [pred, None]
             else:
-                pred = model(im, augment=augment, visualize=visualize)
-
-        # NMS
-        with dt[2]:
-            pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
-
-        # Second-stage classifier (optional)
-        # pred = utils.general.apply_classifier(pred, classifier_model, im, im0s)
-
-        # Process predictions
+                pred = model(x, augment=augment, visualize=visualize)
+        if recorder is not None:
+            recorder.observe("inference", dt[1].dt)
+        return path, im, im0s, vid_cap, s, frame, mode, pred, "detect"
+
+    def postprocess(path, im, im0s, vid_cap, s, frame, mode, pred, status):
+        """NMS and tracking, returns a snapshot of the confirmed objects of every image"""
+        nonlocal last_dets
+        im0_shapes = [x.shape for x in im0s] if webcam else [im0s.shape]
+        detected = status == "detect"
+        if detected and client:
+            last_dets = pred  # already NMS'd and in im0 pixels
+        elif detected:
+            with dt[2]:
+                pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+                if tile:  # cross-tile NMS, returns boxes in im0 coordinates
+                    layouts = [tile_origins(*shape[:2], imgsz, tile_overlap) for shape in im0_shapes]
+                    pred = merge_tiles(pred, layouts, imgsz, im.shape[2:], im0_shapes, iou_thres, max_det, agnostic_nms)
+            if recorder is not None:
+                recorder.observe("nms", dt[2].dt)
+
+            # Second-stage classifier (optional)
+            # pred = utils.general.apply_classifier(pred, classifier_model, im, im0s)
+
+            for det, shape in zip(pred, im0_shapes):
+                if len(det) and not tile:
+                    # Rescale boxes from img_size to im0 size
+                    det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], shape).round()
+            last_dets = pred
+        elif status == "static":
+            pred = last_dets  # the tracker sees the static scene's detections again
+        else:
+            pred = [torch.zeros((0, 6), device=im.device) for _ in im0_shapes]  # skipped by the scheduler
+        if not detected:
+            skipped[status] += len(pred)
+            s += f"({status}) "
+
+        # Track all images of the batch together, every stream keeps its own tracks and frame count. Skipped frames
+        # still advance the frame counts, tracks are moved by motion prediction instead of detections
+        t = time.perf_counter()
+        frame_counts[: len(pred)] += 1
+        if tracker == "byte":
+            # ByteTrack has to see empty frames too, that is how its lost tracks age out
+            online = [
+                t.update(det.cpu().numpy(), shape) if status != "skip" else t.predict()
+                for t, det, shape in zip(object_tracker, pred, im0_shapes)
+            ]
+            confirmed = online
+        else:
+            if status != "skip":
+                object_tracker.update_batch(pred, frame_counts[: len(pred)])
+            else:
+                object_tracker.predict_batch(frame_counts[: len(pred)])
+            confirmed = [object_tracker.get_confirmed_objects(stream=i) for i in range(len(pred))]
+        if recorder is not None:
+            recorder.observe("track", time.perf_counter() - t)
+            recorder.set("active_tracks", sum(map(len, confirmed)))
+        if scheduler and status != "static":
+            scheduler.record(detected, dt[0].dt + (dt[1].dt + dt[2].dt if detected else 0.0))
+        return path, im, im0s, vid_cap, s, frame, mode, pred, confirmed
+
+    def report_queues():
+        """Queue depths as gauges, frames dropped since the last report as a counter"""
+        queues = (pipe.queues if pipe else []) + ([video.queue] if video else []) + ([preview] if preview else [])
+        for q in queues:
+            recorder.set("queue_depth", q.depth, queue=q.name)
+            if q.dropped > dropped.get(q.name, 0):
+                recorder.inc("dropped_frames", q.dropped - dropped.get(q.name, 0), queue=q.name)
+                dropped[q.name] = q.dropped
+
+    def render(path, im, im0s, vid_cap, s, frame, mode, pred, confirmed):
+        """Annotate, display and save every image of the batch"""
+        nonlocal seen
         for i, det in enumerate(pred):  # per image
             seen += 1
             if webcam:  # batch_size >= 1
-                p, im0, frame = path[i], im0s[i].copy(), dataset.count
+                p, im0 = path[i], im0s[i].copy()
                 s += f"{i}: "
             else:
-                p, im0, frame = path, im0s.copy(), getattr(dataset, "frame", 0)
+                p, im0 = path, im0s.copy()
 
             p = Path(p)  # to Path
             save_path = str(save_dir / p.name)  # im.jpg
-            txt_path = str(save_dir / "labels" / p.stem) + ("" if dataset.mode == "image" else f"_{frame}")  # im.txt
             s += "{:g}x{:g} ".format(*im.shape[2:])  # print string
-            gn = torch.tensor(im0.shape)[[1, 0, 1, 0]]  # normalization gain whwh
-            imc = im0.copy() if save_crop else im0  # for save_crop
-            annotator = Annotator(im0, line_width=line_thickness, example=str(names))
-            
-            # Update tracker with current detections
-            if len(det):
-                # Rescale boxes from img_size to im0 size
-                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
-                tracker.update(det, frame_count)
+            t0 = time.perf_counter()
+            if crops:  # candidate crops are cut before annotation, no full-frame copy needed
+                crops.update(i, p.stem, im0, confirmed[i])
             
+            # Buffered result sinks, written from background threads
+            tracks = confirmed[i]  # (M, 7) [x1, y1, x2, y2, track_id, avg_conf, cls]
+            if sinks and len(tracks):
+                stem = p.stem + ("" if mode == "image" else f"_{frame}")  # label file name
+                sinks.add(p.name, frame, im0.shape, tracks[:, 4], tracks[:, 6], tracks[:, 5], tracks[:, :4], label=stem)
+
             # Draw only confirmed objects
-            confirmed_objects = tracker.get_confirmed_objects()
-            for obj_id, obj_data in confirmed_objects.items():
-                xyxy = obj_data['last_bbox']
-                cls = obj_data['class']
-                avg_conf = sum(obj_data['confidence_history'])/len(obj_data['confidence_history'])
-                
-                # Draw the bounding box
-                label = None if hide_labels else (names[cls] if hide_conf else f"{names[cls]} {avg_conf:.2f}")
+            t1 = time.perf_counter()
+            annotator = Annotator(im0, line_width=line_thickness, example=str(names))
+            cls_ids = tracks[:, 6].astype(int).tolist()
+            if hide_labels:
+                labels = [None] * len(cls_ids)
+            elif hide_conf:
+                labels = [names[c] for c in cls_ids]
+            else:
+                labels = [f"{names[c]} {conf:.2f}" for c, conf in zip(cls_ids, tracks[:, 5].tolist())]
+            for xyxy, label, cls in zip(tracks[:, :4].tolist(), labels, cls_ids):
                 annotator.box_label(xyxy, label, color=colors(cls, True))
-                
-                # Optional: Save to CSV/txt if needed
-                if save_csv:
-                    write_to_csv(p.name, names[cls], f"{avg_conf:.2f}")
-                
-                if save_txt:
-                    if save_format == 0:
-                        coords = (xyxy2xywh(torch.tensor(xyxy).view(1, 4)) / gn).view(-1).tolist()
-                    else:
-                        coords = (torch.tensor(xyxy).view(1, 4) / gn).view(-1).tolist()
-                    line = (cls, *coords, avg_conf) if save_conf else (cls, *coords)
-                    with open(f"{txt_path}.txt", "a") as f:
-                        f.write(("%g " * len(line)).rstrip() % line + "\n")
-                
-                if save_crop:
-                    save_one_box(xyxy, imc, file=save_dir / "crops" / names[cls] / f"{p.stem}_{obj_id}.jpg", BGR=True)
 
             # Stream results
             im0 = annotator.result()
-            if view_img:
-                if platform.system() == "Linux" and p not in windows:
-                    windows.append(p)
-                    cv2.namedWindow(str(p), cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO)  # allow window resize (Linux)
-                    cv2.resizeWindow(str(p), im0.shape[1], im0.shape[0])
-                cv2.imshow(str(p), im0)
-                cv2.waitKey(1)  # 1 millisecond
+            t2 = time.perf_counter()
+            if preview:
+                preview.show(str(p), im0)  # shown on the main thread, frames over the display rate are dropped
 
             # Save results (image with detections)
             if save_img:
-                if dataset.mode == "image":
+                if mode == "image":
                     cv2.imwrite(save_path, im0)
                 else:  # 'video' or 'stream'
                     if vid_path[i] != save_path:  # new video
                         vid_path[i] = save_path
-                        if isinstance(vid_writer[i], cv2.VideoWriter):
-                            vid_writer[i].release()  # release previous video writer
                         if vid_cap:  # video
                             fps = vid_cap.get(cv2.CAP_PROP_FPS)
                             w = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -383,15 +549,79 @@ def run(
                         else:  # stream
                             fps, w, h = 30, im0.shape[1], im0.shape[0]
                         save_path = str(Path(save_path).with_suffix(".mp4"))  # force *.mp4 suffix on results videos
-                        vid_writer[i] = cv2.VideoWriter(save_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
-                    vid_writer[i].write(im0)
+                        video.open(i, save_path, fps, (w, h))  # the previous writer is released on the video thread
+                    video.write(i, im0)  # encoded on the video thread, never dropped
+            if recorder is not None:
+                recorder.observe("annotate", t2 - t1)
+                recorder.observe("write", t1 - t0 + time.perf_counter() - t2)
+                recorder.inc("frames")
+        if recorder is not None:
+            report_queues()
 
         # Print time (inference-only)
         LOGGER.info(f"{s}{'' if len(det) else '(no detections), '}{dt[1].dt * 1e3:.1f}ms")
 
+    def postprocess_batch(path, im, im0s, vid_cap, s, frame, mode, pred, status):
+        """Split a collated file batch and run NMS and tracking image by image, in order"""
+        items, start = [], 0
+        for j, im0 in enumerate(im0s):
+            n = 1 + len(tile_origins(*im0.shape[:2], imgsz, tile_overlap)) if tile else 1  # model rows of image j
+            p = None
+            if status == "detect":  # server results are already split per image
+                p = pred[j : j + 1] if client else item_slice(pred, start, start + n)
+            items.append(postprocess(path[j], im[j : j + 1], im0, vid_cap[j], s[j], frame[j], mode[j], p, status))
+            start += n
+        return (items,)
+
+    def render_batch(items):
+        for item in items:
+            render(*item)
+
+    def timed(source):
+        """Iterate the source, reporting how long every read took as the capture stage"""
+        it = iter(source)
+        while True:
+            t = time.perf_counter()
+            item = next(it, None)
+            if item is None:
+                return
+            recorder.observe("capture", time.perf_counter() - t)
+            yield item
+
+    post, rend = (postprocess_batch, render_batch) if batched else (postprocess, render)
+    source = collate(dataset, batch_size) if batched else dataset
+    source = timed(source) if recorder is not None else source
+    try:
+        if pipeline:
+            # Every stage on its own thread; live sources drop stale frames instead of building up latency
+            stages = [("capture", preprocess), ("inference", inference), ("postprocess", post), ("render", rend)]
+            pipe = Pipeline(source, stages, maxsize=4, policy="drop" if webcam or screenshot else "block")
+            pipe.run()
+            LOGGER.info(f"Pipeline: {pipe.summary()}")
+        else:
+            for batch in source:
+                rend(*post(*inference(*preprocess(*batch))))
+    finally:
+        sinks.close()  # flush buffered results
+        if crops:
+            crops.close()  # write the best crop of every remaining track
+        if video:
+            video.close()  # encode queued frames and release the writers
+            LOGGER.info(f"Video: {video.summary()}")
+        if preview:
+            LOGGER.info(f"Preview: {preview.summary()}")
+        if metrics:
+            metrics.close()
+
     # Print results
-    t = tuple(x.t / seen * 1e3 for x in dt)  # speeds per image
+    n_static, n_skip = skipped["static"], skipped["skip"]
+    n = (seen, seen - n_static - n_skip, seen - n_static - n_skip)  # images that ran each stage
+    t = tuple(x.t / max(k, 1) * 1e3 for x, k in zip(dt, n))  # speeds per image
     LOGGER.info(f"Speed: %.1fms pre-process, %.1fms inference, %.1fms NMS per image at shape {(1, 3, *imgsz)}" % t)
+    if gate or scheduler:
+        LOGGER.info(f"Skipped detection on {n_static} static and {n_skip} over-budget of {seen} images")
+    if scheduler:
+        LOGGER.info(f"Scheduler: {scheduler.summary()}")
     if save_txt or save_img:
         s = f"\n{len(list(save_dir.glob('labels/*.txt')))} labels saved to {save_dir / 'labels'}" if save_txt else ""
         LOGGER.info(f"Results saved to {colorstr('bold', save_dir)}{s}")
@@ -415,8 +645,11 @@ def parse_opt():
         --view-img (bool, optional): Flag to display results. Defaults to False.
         --save-txt (bool, optional): Flag to save results to *.txt files. Defaults to False.
         --save-csv (bool, optional): Flag to save results in CSV format. Defaults to False.
+        --save-jsonl (bool, optional): Flag to save results in JSON Lines format. Defaults to False.
+        --save-parquet (bool, optional): Flag to save results in Parquet format. Defaults to False.
         --save-conf (bool, optional): Flag to save confidences in labels saved via --save-txt. Defaults to False.
-        --save-crop (bool, optional): Flag to save cropped prediction boxes. Defaults to False.
+        --save-crop (bool, optional): Flag to save the best crop of every confirmed track. Defaults to False.
+        --crop-refresh (int, optional): Rewrite improved crops every N frames, 0 on track end only. Defaults to 0.
         --nosave (bool, optional): Flag to prevent saving images/videos. Defaults to False.
         --classes (list[int], optional): List of classes to filter results by, e.g., '--classes 0 2 3'. Defaults to None.
         --agnostic-nms (bool, optional): Flag for class-agnostic NMS. Defaults to False.
@@ -433,6 +666,21 @@ def parse_opt():
         --dnn (bool, optional): Flag to use OpenCV DNN for ONNX inference. Defaults to False.
         --vid-stride (int, optional): Video frame-rate stride, determining the number of frames to skip in between
             consecutive frames. Defaults to 1.
+        --target-fps (float, optional): Frame rate budget, detection is skipped on frames that would exceed it and
+            the tracker predicts them instead. 0 detects every frame. Defaults to 0.
+        --max-stride (int, optional): With --target-fps, the most frames between two detections. Defaults to 8.
+        --motion-gate (bool, optional): Flag to skip detection on static frames and carry the last detections
+            forward. Defaults to False.
+        --motion-thresh (float, optional): Fraction of the downsampled frame that must change. Defaults to 0.002.
+        --tile (bool, optional): Flag for sliced inference on overlapping native-resolution tiles. Defaults to False.
+        --tile-overlap (float, optional): Overlap between neighbouring tiles. Defaults to 0.2.
+        --batch-size (int, optional): Images or consecutive video frames per forward pass for file sources.
+            Defaults to 1.
+        --metrics-port (int, optional): Serve Prometheus metrics on this local port, 0 disables. Defaults to 0.
+        --server (str, optional): URL of a running pipeline/server.py to detect with, '' loads the model locally.
+            Defaults to ''.
+        --tracker (str, optional): Object tracker, 'simple' or 'byte'. Defaults to 'simple'.
+        --pipeline (bool, optional): Flag to run the detection stages as a multi-threaded pipeline. Defaults to False.
 
     Returns:
         argparse.Namespace: Parsed command-line arguments as an argparse.Namespace object.
@@ -461,8 +709,11 @@ def parse_opt():
         help="whether to save boxes coordinates in YOLO format or Pascal-VOC format when save-txt is True, 0 for YOLO and 1 for Pascal-VOC",
     )
     parser.add_argument("--save-csv", action="store_true", help="save results in CSV format")
+    parser.add_argument("--save-jsonl", action="store_true", help="save results in JSON Lines format")
+    parser.add_argument("--save-parquet", action="store_true", help="save results in Parquet format")
     parser.add_argument("--save-conf", action="store_true", help="save confidences in --save-txt labels")
     parser.add_argument("--save-crop", action="store_true", help="save cropped prediction boxes")
+    parser.add_argument("--crop-refresh", type=int, default=0, help="rewrite best crops every N frames, 0: track end")
     parser.add_argument("--nosave", action="store_true", help="do not save images/videos")
     parser.add_argument("--classes", nargs="+", type=int, help="filter by class: --classes 0, or --classes 0 2 3")
     parser.add_argument("--agnostic-nms", action="store_true", help="class-agnostic NMS")
@@ -478,6 +729,17 @@ def parse_opt():
     parser.add_argument("--half", action="store_true", help="use FP16 half-precision inference")
     parser.add_argument("--dnn", action="store_true", help="use OpenCV DNN for ONNX inference")
     parser.add_argument("--vid-stride", type=int, default=1, help="video frame-rate stride")
+    parser.add_argument("--target-fps", type=float, default=0, help="adaptive frame skipping budget, 0 to disable")
+    parser.add_argument("--max-stride", type=int, default=8, help="most frames between detections with --target-fps")
+    parser.add_argument("--motion-gate", action="store_true", help="skip detection on static frames")
+    parser.add_argument("--motion-thresh", type=float, default=0.002, help="changed area fraction for --motion-gate")
+    parser.add_argument("--tile", action="store_true", help="sliced inference on overlapping native-resolution tiles")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="overlap between tiles as a fraction")
+    parser.add_argument("--batch-size", type=int, default=1, help="images per forward pass for file sources")
+    parser.add_argument("--metrics-port", type=int, default=0, help="serve Prometheus metrics on this port, 0: off")
+    parser.add_argument("--server", type=str, default="", help="detect with a running pipeline/server.py at this URL")
+    parser.add_argument("--tracker", type=str, default="simple", choices=["simple", "byte"], help="object tracker")
+    parser.add_argument("--pipeline", action="store_true", help="run detection stages on separate threads")
     opt = parser.parse_args()
     opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
     print_args(vars(opt))
@@ -0,0 +1,30 @@
+import numpy as np
+
+
+def collate(dataset, batch_size):
+    """
+    Group consecutive (path, im, im0s, vid_cap, s) items of a LoadImages dataset into batches of up to batch_size.
+
+    Yields (paths, ims, im0s, vid_caps, strings, frames, modes) tuples of per-item lists, with the letterboxed images
+    stacked into one (B, 3, h, w) array. The video frame index and dataset mode ("image" or "video") of every item are
+    read while iterating, so they stay correct however far the consumer lags behind, even though the loader reads one
+    item past the batch. An item with a different letterboxed shape closes the batch early.
+    """
+    items = []
+    for path, im, im0s, vid_cap, s in dataset:
+        if items and (len(items) == batch_size or im.shape != items[0][1].shape):
+            yield _stack(items)
+            items = []
+        items.append((path, im, im0s, vid_cap, s, getattr(dataset, "frame", 0), dataset.mode))
+    if items:
+        yield _stack(items)
+
+
+def _stack(items):
+    paths, ims, im0s, vid_caps, strings, frames, modes = map(list, zip(*items))
+    return paths, np.stack(ims), im0s, vid_caps, strings, frames, modes
+
+
+def item_slice(pred, start, stop):
+    """Rows start:stop of a raw model output, which may be a tensor or a (tensor, ...) list/tuple"""
+    return pred[0][start:stop] if isinstance(pred, (list, tuple)) else pred[start:stop]
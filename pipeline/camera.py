@@ -0,0 +1,107 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class CameraService:
+    """
+    Keep a capture device open and its newest frame at hand.
+
+    `start` opens the device once, asks for a capture size near the model input and starts a thread that keeps
+    grabbing into a small ring of preallocated frames. `latest` returns the newest frame as a read-only view without
+    copying; it stays valid until the next `latest` call, because the grabber never writes into the slot that was
+    handed out last. The first `settle_frames` frames are not served, so auto-exposure has settled. After
+    `idle_timeout` seconds without a `latest` call the device is released, the next call opens it again.
+    """
+
+    def __init__(self, source=0, size=(640, 480), fps=30, slots=4, settle_frames=10, idle_timeout=60.0):
+        assert slots >= 3, "the grabber needs a free slot next to the newest and the handed-out frame"
+        self.source = source
+        self.size = size  # requested (width, height), the device picks its nearest supported mode
+        self.fps = fps
+        self.settle_frames = settle_frames
+        self.idle_timeout = idle_timeout
+        self.frames = 0  # frames grabbed since the device was last opened
+        self.opens = 0
+        self._slots = [None] * slots
+        self._newest = -1
+        self._leased = -1
+        self._last_used = 0.0
+        self._running = False
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Open the device and start grabbing unless that already happened, returns False if it cannot be opened"""
+        with self._lock:
+            self._last_used = time.monotonic()
+            if self._running:
+                return True
+            cap = cv2.VideoCapture(self.source)
+            if not cap.isOpened():
+                return False
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.size[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.size[1])
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # do not queue stale frames in the driver, where supported
+            w, h = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self._slots = [np.empty((h, w, 3), dtype=np.uint8) for _ in self._slots]
+            self._newest = self._leased = -1
+            self.frames = 0
+            self.opens += 1
+            self._running = True
+            self._ready.clear()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(cap,), name="camera", daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self, cap):
+        try:
+            while not self._stop.is_set():
+                with self._lock:
+                    if time.monotonic() - self._last_used > self.idle_timeout:
+                        self._running = False  # idle, release the device until the next latest()
+                        self._ready.clear()
+                        return
+                    i = next(j for j in range(len(self._slots)) if j not in (self._newest, self._leased))
+                ok, frame = cap.read(self._slots[i])
+                if not ok:
+                    time.sleep(0.01)
+                    continue
+                with self._lock:
+                    self._slots[i] = frame  # the same array, unless the device changed the frame size
+                    self._newest = i
+                    self.frames += 1
+                    if self.frames >= self.settle_frames:
+                        self._ready.set()
+        finally:
+            with self._lock:
+                self._running = False
+            cap.release()
+
+    def latest(self, timeout=5.0):
+        """Newest frame as a read-only HWC BGR view, valid until the next call, None if the device gives nothing"""
+        if not self.start() or not self._ready.wait(timeout):
+            return None
+        with self._lock:
+            self._leased = self._newest
+            frame = self._slots[self._newest].view()
+        frame.flags.writeable = False  # shared with the grabber, copy it to modify or keep it longer
+        return frame
+
+    def close(self):
+        """Stop grabbing and release the device"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._ready.clear()
+
+    def summary(self):
+        h, w = self._slots[0].shape[:2] if self._slots[0] is not None else (0, 0)
+        return f"{w}x{h} capture, {self.frames} frames since open, opened {self.opens} times"
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class DetectionResult:
+    """
+    Detections of one image, a compact stand-in for `results.pandas().xyxy[0]`.
+
+    `data` is the (N, 6) float32 NMS output [x1, y1, x2, y2, conf, cls] in original pixels and `names` maps a class
+    index to its name. Columns are views of `data`, iterating yields (name, confidence) pairs, so the caller never
+    imports pandas or builds a DataFrame. `pandas()` is there for the callers that still want one.
+    """
+
+    __slots__ = ("data", "names")
+
+    def __init__(self, data, names):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+        self.names = names
+
+    @classmethod
+    def from_results(cls, results, i=0):
+        """Image i of the AutoShape output of `model(frame)`, without going through pandas"""
+        return cls(results.pred[i].cpu().numpy(), results.names)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        """Rows selected by an index, slice or mask, as a DetectionResult"""
+        return DetectionResult(self.data[index], self.names)
+
+    def __iter__(self):
+        return zip(self.labels, self.conf.tolist())
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, 4]
+
+    @property
+    def cls(self):
+        return self.data[:, 5].astype(int)
+
+    @property
+    def labels(self):
+        """Class name of every row"""
+        return [self.names[c] for c in self.cls.tolist()]
+
+    def pandas(self):
+        """The DataFrame `results.pandas().xyxy[0]` would have returned"""
+        import pandas as pd
+
+        df = pd.DataFrame(self.data[:, :5], columns=["xmin", "ymin", "xmax", "ymax", "confidence"])
+        df["class"] = self.cls
+        df["name"] = self.labels
+        return df
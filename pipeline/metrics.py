@@ -0,0 +1,151 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+STAGES = ("capture", "preprocess", "inference", "nms", "track", "annotate", "write")  # in pipeline order
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+
+def _key(name, labels):
+    """Metric name with Prometheus label syntax, e.g. queue_depth{queue="capture->inference"}"""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+class StageRecorder:
+    """
+    In-memory collector for per-stage latencies, counters and gauges, used by benchmarks.
+
+    `detect.run(recorder=...)` reports every stage it times with `observe(stage, seconds)`, counts events with `inc`
+    and sets point-in-time values with `set`. Samples are kept in full so percentiles are exact. `started` is the
+    perf_counter time (and `cpu_started` the process CPU time) of the first observation, so model loading is not
+    counted against throughput.
+    """
+
+    def __init__(self):
+        self.started = None
+        self.cpu_started = None
+        self.samples = defaultdict(list)
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self._lock = threading.Lock()  # stages report from different threads in pipeline mode
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            if self.started is None:
+                self.started = time.perf_counter() - seconds
+                self.cpu_started = time.process_time()
+            self.samples[stage].append(seconds)
+
+    def inc(self, name, n=1, **labels):
+        with self._lock:
+            self.counters[_key(name, labels)] += n
+
+    def set(self, name, value, **labels):
+        self.gauges[_key(name, labels)] = value
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """{stage: {"count", "mean", "p50", ...}} with latencies in milliseconds"""
+        out = {}
+        with self._lock:
+            samples = {k: np.asarray(v) * 1e3 for k, v in self.samples.items() if v}
+        for stage in sorted(samples, key=lambda k: STAGES.index(k) if k in STAGES else len(STAGES)):
+            ms = samples[stage]
+            out[stage] = {"count": len(ms), "mean": float(ms.mean())}
+            out[stage].update({f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(ms, percentiles))})
+        return out
+
+
+class PrometheusMetrics:
+    """
+    Live metrics in the Prometheus text exposition format, served from a local HTTP endpoint by `serve`.
+
+    Same observe/inc/set interface as StageRecorder, so it can be passed anywhere a recorder is accepted. Stage
+    latencies go into fixed-bucket histograms: an observation is one bisect and two additions under a lock, cheap
+    enough to leave on in production. Counters are exported with a _total suffix, all names get the namespace prefix.
+    """
+
+    def __init__(self, namespace="uc4me", buckets=BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self.histograms = {}  # stage -> [per-bucket counts incl. +Inf, sum]
+        self.counters = defaultdict(float)
+        self.gauges = {}
+        self.server = None
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            h = self.histograms.get(stage)
+            if h is None:
+                h = self.histograms[stage] = [[0] * (len(self.buckets) + 1), 0.0]
+            h[0][i] += 1
+            h[1] += seconds
+
+    def inc(self, name, n=1, **labels):
+        with self._lock:
+            self.counters[_key(name, labels)] += n
+
+    def set(self, name, value, **labels):
+        self.gauges[_key(name, labels)] = value
+
+    def render(self):
+        """All metrics as Prometheus exposition text"""
+        ns = self.namespace
+        with self._lock:
+            histograms = {k: (list(v[0]), v[1]) for k, v in self.histograms.items()}
+            counters = dict(self.counters)
+        gauges = dict(self.gauges)
+
+        lines = [f"# HELP {ns}_stage_seconds Latency of each processing stage", f"# TYPE {ns}_stage_seconds histogram"]
+        for stage, (counts, total) in sorted(histograms.items()):
+            cumulative = 0
+            for le, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {cumulative}')
+        for kind, suffix, values in (("counter", "_total", counters), ("gauge", "", gauges)):
+            typed = set()
+            for key, value in sorted(values.items()):
+                name, _, labels = key.partition("{")
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {ns}_{name}{suffix} {kind}")
+                lines.append(f"{ns}_{name}{suffix}{'{' + labels if labels else ''} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve GET /metrics on a daemon thread, returns self"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # keep scrapes out of the console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+        return self
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = Path(os.getenv("UC4ME_CACHE", Path.home() / ".cache" / "uc4me"))  # override with UC4ME_CACHE
+YOLOV5_DIR = os.getenv("UC4ME_YOLOV5")  # a YOLOv5 checkout, the torch.hub copy is used if unset
+
+
+def file_hash(path, chunk=1 << 20):
+    """First 16 hex digits of the SHA-256 of a file"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(chunk):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def cache_path(weights, cache_dir=CACHE_DIR):
+    """Cached artifact of weights, keyed by content hash and torch version so stale pickles are never loaded"""
+    weights = Path(weights)
+    return Path(cache_dir) / f"{weights.stem}-{file_hash(weights)}-torch{torch.__version__.split('+')[0]}.pt"
+
+
+def yolov5_source():
+    """
+    Make the YOLOv5 `models` package importable, it is needed to build and to unpickle the model. Looks at sys.path,
+    then UC4ME_YOLOV5, then the copy torch.hub keeps after a first torch.hub.load. Returns False if there is none.
+    """
+    try:
+        import models.common  # noqa: F401
+
+        return True
+    except ImportError:
+        pass
+    for d in (YOLOV5_DIR, Path(torch.hub.get_dir()) / "ultralytics_yolov5_master"):
+        if d and (Path(d) / "models" / "common.py").exists():
+            sys.path.append(str(d))
+            return True
+    return False
+
+
+def build(weights, f):
+    """Load weights, fuse Conv+BN and pickle the ready-to-run FP32 module to f"""
+    from models.experimental import attempt_load
+
+    model = attempt_load(weights, device=torch.device("cpu"), inplace=True, fuse=True)
+    f.parent.mkdir(parents=True, exist_ok=True)
+    tmp = f.with_suffix(f".{os.getpid()}.tmp")
+    torch.save(model, tmp)
+    os.replace(tmp, f)  # atomic, a concurrent start never reads a half-written file
+    return f
+
+
+def load_model(weights=None, device="cpu", cache_dir=CACHE_DIR, autoshape=True):
+    """
+    Local replacement for torch.hub.load('ultralytics/yolov5', 'yolov5n'): no network, no hub repo check.
+
+    The YOLOv5 code comes from `yolov5_source`. On a machine without any copy the weights load once through
+    torch.hub.load(..., 'custom'), which downloads the code (needs network) and keeps it for the next starts. With the
+    code in place, the first start fuses the weights and pickles the module to `cache_dir`; later starts memory-map
+    that file, so tensors are paged in from the OS cache instead of being unpickled and fused again. With autoshape
+    the model is wrapped like the hub model (`model(frame).pandas()` works), otherwise the fused DetectionModel is
+    returned. Exported weights (ONNX, OpenVINO, ...) are already ready to run and load through DetectMultiBackend
+    uncached. weights defaults to the bundled yolov5n.pt.
+    """
+    weights = weights or ROOT / "yolov5n.pt"
+    if not yolov5_source():
+        return torch.hub.load("ultralytics/yolov5", "custom", path=str(weights), device=device, autoshape=autoshape)
+    if Path(weights).suffix != ".pt":
+        from models.common import DetectMultiBackend
+
+        model = DetectMultiBackend(weights, device=torch.device(device))
+    else:
+        f = cache_path(weights, cache_dir)
+        if not f.exists():
+            build(weights, f)
+        try:
+            model = torch.load(f, map_location="cpu", mmap=True, weights_only=False)
+        except TypeError:  # torch < 2.1 has no mmap
+            model = torch.load(f, map_location="cpu")
+        model = model.to(device).eval()
+    if autoshape:
+        from models.common import AutoShape
+
+        model = AutoShape(model)
+    return model
@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+
+
+def tensor_thumbnail(im, size=64):
+    """(B, 3, H, W) letterboxed 0-1 batch to (B, size, size) grayscale thumbnails, pooled on the tensor's device"""
+    import torch.nn.functional as F  # here so image-only users (the assistants) do not pay for importing torch
+
+    return F.adaptive_avg_pool2d(im.float().mean(1, keepdim=True), size)[:, 0].cpu().numpy()
+
+
+def image_thumbnail(im, size=64):
+    """HWC BGR uint8 image to a (1, size, size) 0-1 grayscale thumbnail"""
+    gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY) if im.ndim == 3 else im
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)[None].astype(np.float32) / 255
+
+
+class MotionGate:
+    """
+    Cheap change detector that decides whether a frame needs the detector at all.
+
+    Thumbnails are compared cell by cell against the reference, the last frame that actually went through the
+    detector (set with `update`). A frame counts as changed when more than `min_area` of the cells of any image differ
+    by more than `pixel_thresh`. Slow drift such as lighting accumulates against the reference until it passes, and
+    after `max_static` static frames in a row one frame is let through regardless.
+    """
+
+    def __init__(self, pixel_thresh=0.05, min_area=0.002, max_static=300):
+        self.pixel_thresh = pixel_thresh
+        self.min_area = min_area
+        self.max_static = max_static
+        self.reference = None
+        self.static_run = 0
+        self.static = 0  # frames judged static so far
+
+    def changed(self, thumb):
+        """True if the (B, S, S) thumbnail differs enough from the reference to need detection"""
+        ref = self.reference
+        if ref is None or ref.shape != thumb.shape or self.static_run >= self.max_static:
+            return True
+        area = (np.abs(thumb - ref) > self.pixel_thresh).reshape(len(thumb), -1).mean(1)
+        if area.max() > self.min_area:
+            return True
+        self.static_run += 1
+        self.static += 1
+        return False
+
+    def update(self, thumb):
+        """Make `thumb` the reference, call this for every frame that was run through the detector"""
+        self.reference = thumb
+        self.static_run = 0
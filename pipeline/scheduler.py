@@ -0,0 +1,57 @@
+import threading
+
+
+class FrameScheduler:
+    """
+    Decide per frame whether to run the detector, so that measured processing time fits a per-frame budget.
+
+    Every incoming frame earns `budget` seconds of credit and every processed frame spends the time it actually took
+    (as measured by the Profile timers). A frame gets full detection once the credit covers the smoothed cost of a
+    detection, otherwise the tracker's motion prediction stands in for it. Cheap scenes are detected on every frame,
+    expensive ones at a stride of roughly cost / budget, never more than `max_stride` frames apart.
+    """
+
+    def __init__(self, budget, max_stride=8, momentum=0.8):
+        assert budget > 0, "the frame budget must be positive"
+        self.budget = budget
+        self.max_stride = max(int(max_stride), 1)
+        self.momentum = momentum
+        self.detect_cost = None  # smoothed seconds per detected frame
+        self.skip_cost = 0.0  # smoothed seconds per skipped frame
+        self.credit = 0.0
+        self.since_detect = self.max_stride
+        self.detected = 0
+        self.skipped = 0
+        self._lock = threading.Lock()  # decisions and measurements come from different stages in pipeline mode
+
+    def should_detect(self):
+        """Called once per incoming frame, True if it should go through the detector"""
+        with self._lock:
+            cost = self.detect_cost
+            self.credit = min(self.credit + self.budget, max(self.budget, cost or 0.0))
+            detect = cost is None or self.since_detect >= self.max_stride or self.credit >= cost
+            self.since_detect = 0 if detect else self.since_detect + 1
+            return detect
+
+    def record(self, detected, seconds):
+        """Report the measured processing time of a frame"""
+        with self._lock:
+            if detected:
+                self.detected += 1
+                m = self.momentum if self.detect_cost is not None else 0.0
+                self.detect_cost = m * (self.detect_cost or 0.0) + (1 - m) * seconds
+            else:
+                self.skipped += 1
+                self.skip_cost = self.momentum * self.skip_cost + (1 - self.momentum) * seconds
+            self.credit = max(self.credit - seconds, -self.max_stride * self.budget)
+
+    @property
+    def stride(self):
+        """Mean number of frames per detection so far"""
+        return (self.detected + self.skipped) / max(self.detected, 1)
+
+    def summary(self):
+        return (
+            f"{self.detected} detected, {self.skipped} skipped (stride {self.stride:.2f}), "
+            f"{(self.detect_cost or 0.0) * 1e3:.1f}ms per detection vs {self.budget * 1e3:.1f}ms budget"
+        )
@@ -0,0 +1,287 @@
+"""
+Resident detection server: one model in memory for every script on this machine.
+
+Clients POST original BGR frames to http://127.0.0.1:<port>/detect and get back (N, 6) [x1, y1, x2, y2, conf, cls]
+detections in the frame's own pixels. Frames from concurrent requests are letterboxed to one shape and gathered into
+micro-batches for up to `max_wait` seconds, so under load one forward pass serves several clients.
+
+Usage:
+    $ python pipeline/server.py --weights yolov5n.pt --port 8765 --max-batch 16 --max-wait 0.005
+"""
+
+import argparse
+import http.client
+import io
+import json
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from queue import Empty, Queue
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from pipeline.batching import item_slice
+
+NMS_PARAMS = ("conf_thres", "iou_thres", "classes", "max_det", "agnostic")  # per-request query parameters, as JSON
+
+
+def _dumps(arrays):
+    """Serialize a list of arrays as an .npz body"""
+    buf = io.BytesIO()
+    np.savez(buf, *arrays)
+    return buf.getvalue()
+
+
+def _loads(body):
+    """Inverse of _dumps"""
+    with np.load(io.BytesIO(body)) as f:
+        return [f[f"arr_{i}"] for i in range(len(f.files))]
+
+
+class MicroBatcher:
+    """
+    Gather items submitted from many threads into batches for one worker thread.
+
+    The worker blocks for the first item, then keeps collecting for up to `max_wait` seconds or until `max_batch`
+    items are pending, and calls `fn(items)`, which must return one result per item. A lone request therefore waits
+    at most `max_wait`, while concurrent ones share a forward pass.
+    """
+
+    def __init__(self, fn, max_batch=16, max_wait=0.005):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._run, name="batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue one item, returns a Future of its result"""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            if pending[0] is None:
+                return
+            deadline = time.perf_counter() + self.max_wait
+            while len(pending) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # finish this batch, stop on the next get
+                    break
+                pending.append(item)
+            try:
+                results = self.fn([item for item, _ in pending])
+            except Exception as e:  # fail the requests of this batch, keep serving
+                for _, future in pending:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(pending, results):
+                    future.set_result(result)
+            self.batches += 1
+            self.items += len(pending)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def summary(self):
+        return f"{self.items} images in {self.batches} batches, {self.items / max(self.batches, 1):.1f} mean batch"
+
+
+class DetectionServer:
+    """
+    Holds one DetectMultiBackend model and serves it over localhost HTTP.
+
+    GET /info returns {"names", "stride", "imgsz"}. POST /detect takes an .npz of HWC BGR uint8 frames, optionally with
+    conf_thres, iou_thres, classes, max_det and agnostic query parameters (JSON values), and returns an .npz of (N, 6)
+    float32 detections per frame. Every frame is letterboxed to the fixed `imgsz` so frames of any size share a batch.
+    """
+
+    def __init__(self, weights, imgsz=(640, 640), device="", half=False, max_batch=16, max_wait=0.005):
+        import torch
+
+        from models.common import DetectMultiBackend
+        from utils.general import check_img_size
+        from utils.torch_utils import select_device
+
+        self.torch = torch
+        self.model = DetectMultiBackend(weights, device=select_device(device), fp16=half)
+        self.imgsz = check_img_size(imgsz, s=self.model.stride)
+        self.model.warmup(imgsz=(1, 3, *self.imgsz))
+        self.batcher = MicroBatcher(self._detect, max_batch=max_batch, max_wait=max_wait)
+        self.server = None
+
+    def info(self):
+        names = self.model.names
+        names = names if isinstance(names, dict) else dict(enumerate(names))
+        return {"names": {int(k): v for k, v in names.items()}, "stride": int(self.model.stride), "imgsz": self.imgsz}
+
+    def _detect(self, items):
+        """Run one micro-batch of (im0, nms kwargs) items, returns (N, 6) arrays in im0 pixels"""
+        from utils.augmentations import letterbox
+        from utils.general import non_max_suppression, scale_boxes
+
+        torch, model = self.torch, self.model
+        ims = [letterbox(im0, self.imgsz, stride=model.stride, auto=False)[0] for im0, _ in items]
+        im = np.ascontiguousarray(np.stack(ims).transpose((0, 3, 1, 2))[:, ::-1])  # BHWC BGR to BCHW RGB
+        with torch.no_grad():
+            im = torch.from_numpy(im).to(model.device)
+            im = (im.half() if model.fp16 else im.float()) / 255
+            pred = model(im)
+            out = []
+            for j, (im0, params) in enumerate(items):
+                det = non_max_suppression(item_slice(pred, j, j + 1), **params)[0]
+                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
+                out.append(det.cpu().numpy().astype(np.float32))
+        return out
+
+    def detect(self, ims, **params):
+        """Detect on a list of frames from this process, through the same micro-batches as remote clients"""
+        futures = [self.batcher.submit((im0, params)) for im0 in ims]
+        return [f.result() for f in futures]
+
+    def serve(self, port=8765, host="127.0.0.1"):
+        """Serve /info and /detect on a daemon thread, returns self"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, clients reuse one connection per thread
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def _reply(self, body, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if urlparse(self.path).path != "/info":
+                    self.send_error(404)
+                    return
+                self._reply(json.dumps(server.info()).encode(), "application/json")
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                if url.path != "/detect":
+                    self.send_error(404)
+                    return
+                query = {k: v[0] for k, v in parse_qs(url.query).items() if k in NMS_PARAMS}
+                params = {k: json.loads(v) for k, v in query.items()}
+                try:
+                    ims = _loads(self.rfile.read(int(self.headers["Content-Length"])))
+                    dets = server.detect(ims, **params)
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                self._reply(_dumps(dets), "application/octet-stream")
+
+            def log_message(self, *args):
+                pass  # one line per frame would flood the console
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="server", daemon=True).start()
+        return self
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        self.batcher.close()
+
+
+class DetectionClient:
+    """
+    Client of a DetectionServer, safe to share between threads (one keep-alive connection per thread).
+
+    `names`, `stride` and `imgsz` of the served model are read once from /info.
+    """
+
+    def __init__(self, url="http://127.0.0.1:8765", timeout=30.0):
+        url = urlparse(url if "://" in url else f"http://{url}")
+        self.host, self.port, self.timeout = url.hostname, url.port or 80, timeout
+        self._local = threading.local()
+        info = json.loads(self._request("GET", "/info"))
+        self.names = {int(k): v for k, v in info["names"].items()}
+        self.stride, self.imgsz = info["stride"], info["imgsz"]
+
+    def _request(self, method, path, body=None):
+        for attempt in range(2):  # the server may have closed an idle keep-alive connection
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                conn.connect()
+                conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                conn.request(method, path, body)
+                r = conn.getresponse()
+                data = r.read()
+            except (ConnectionError, http.client.HTTPException):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+                continue
+            if r.status != 200:
+                raise RuntimeError(f"detection server {method} {path}: {r.status} {r.reason}")
+            return data
+
+    def detect_batch(self, ims, conf_thres=0.25, iou_thres=0.45, classes=None, max_det=1000, agnostic=False):
+        """(N, 6) [x1, y1, x2, y2, conf, cls] float32 detections for every HWC BGR frame of ims"""
+        params = dict(conf_thres=conf_thres, iou_thres=iou_thres, classes=classes, max_det=max_det, agnostic=agnostic)
+        query = urlencode({k: json.dumps(v) for k, v in params.items()})
+        return _loads(self._request("POST", f"/detect?{query}", _dumps([np.asarray(im) for im in ims])))
+
+    def detect(self, im0, **kwargs):
+        """Detections of a single frame"""
+        return self.detect_batch([im0], **kwargs)[0]
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default=ROOT / "yolov5n.pt", help="model path")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640], help="inference size h,w")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
+    parser.add_argument("--half", action="store_true", help="use FP16 half-precision inference")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--max-batch", type=int, default=16, help="most frames per forward pass")
+    parser.add_argument("--max-wait", type=float, default=0.005, help="seconds to wait for more frames of a batch")
+    opt = parser.parse_args()
+    opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
+    return opt
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    server = DetectionServer(opt.weights, opt.imgsz, opt.device, opt.half, opt.max_batch, opt.max_wait)
+    server.serve(opt.port, opt.host)
+    print(f"Serving {opt.weights} on http://{opt.host}:{opt.port}, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(server.batcher.summary())
@@ -0,0 +1,138 @@
+import queue
+import threading
+
+_STOP = object()  # end-of-stream marker passed down the queues
+
+
+class StageQueue:
+    """
+    Bounded queue between two pipeline stages.
+
+    policy='block' makes the producer wait for the consumer (files, nothing may be lost), policy='drop' discards the
+    oldest queued item instead so a live source always feeds the freshest frame downstream.
+    """
+
+    def __init__(self, name, maxsize=4, policy="block", stop=None):
+        assert policy in ("block", "drop"), f"unknown backpressure policy '{policy}'"
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.stop = stop or threading.Event()
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.max_depth = 0
+        self._depth_sum = 0
+        self._puts = 0
+
+    def put(self, item):
+        """Enqueue an item, returns False if the pipeline was stopped while waiting"""
+        while True:
+            try:
+                self.queue.put(item, block=self.policy == "block", timeout=0.1)
+                break
+            except queue.Full:
+                if self.stop.is_set():
+                    return False
+                if self.policy == "drop":
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        depth = self.queue.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_sum += depth
+        self._puts += 1
+        return True
+
+    def get(self):
+        """Dequeue the next item, _STOP once the pipeline ends"""
+        while True:
+            try:
+                return self.queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.stop.is_set():
+                    return _STOP
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    @property
+    def mean_depth(self):
+        return self._depth_sum / max(self._puts, 1)
+
+    def summary(self):
+        return (
+            f"{self.name} queue depth {self.mean_depth:.1f} mean, {self.max_depth}/{self.maxsize} max, "
+            f"{self.dropped} dropped"
+        )
+
+
+class Pipeline:
+    """
+    Run a chain of stages concurrently, each stage on its own thread connected by bounded StageQueues.
+
+    stages is a list of (name, fn) pairs. The first stage is fed from `source` (an iterable of argument tuples),
+    every stage receives the tuple returned by the previous one. The last stage runs on the calling thread so GUI
+    calls such as cv2.imshow stay on the main thread. Throughput approaches that of the slowest stage.
+    """
+
+    def __init__(self, source, stages, maxsize=4, policy="block"):
+        assert len(stages) >= 2, "a pipeline needs at least two stages"
+        self.source = source
+        self.names, self.stages = zip(*stages)
+        self.stop = threading.Event()
+        self.error = None
+        # The first queue absorbs source backpressure, later queues always block so no processed frame is lost
+        self.queues = [
+            StageQueue(f"{self.names[i]}->{self.names[i + 1]}", maxsize, policy if i == 0 else "block", self.stop)
+            for i in range(len(self.stages) - 1)
+        ]
+
+    def _produce(self):
+        try:
+            for item in self.source:
+                if self.stop.is_set() or not self.queues[0].put(self.stages[0](*item)):
+                    break
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.queues[0].put(_STOP)
+
+    def _work(self, i):
+        q_in, q_out = self.queues[i - 1], self.queues[i]
+        try:
+            while (item := q_in.get()) is not _STOP:
+                if not q_out.put(self.stages[i](*item)):
+                    break
+        except BaseException as e:
+            self.error = e
+        finally:
+            q_out.put(_STOP)
+
+    def run(self):
+        """Process the whole source, re-raising the first error of any stage"""
+        threads = [threading.Thread(target=self._produce, name=self.names[0], daemon=True)]
+        threads += [
+            threading.Thread(target=self._work, args=(i,), name=self.names[i], daemon=True)
+            for i in range(1, len(self.stages) - 1)
+        ]
+        for t in threads:
+            t.start()
+        try:
+            while (item := self.queues[-1].get()) is not _STOP:
+                self.stages[-1](*item)
+        finally:
+            self.stop.set()
+            for t in threads:
+                t.join()
+        if self.error is not None:
+            raise self.error
+
+    def depths(self):
+        """Current depth of every queue, keyed by queue name"""
+        return {q.name: q.depth for q in self.queues}
+
+    def summary(self):
+        return ", ".join(q.summary() for q in self.queues)
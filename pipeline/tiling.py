@@ -0,0 +1,82 @@
+import numpy as np
+import torch
+import torch.nn.functional as F
+import torchvision
+
+from utils.general import scale_boxes
+
+
+def tile_origins(h, w, size, overlap=0.2):
+    """Top-left (x, y) corners of overlapping (th, tw) tiles covering an h x w frame, the last tiles end at the edge"""
+    th, tw = size
+
+    def starts(n, t):
+        step = max(int(t * (1 - overlap)), 1)
+        return [0] if n <= t else [*range(0, n - t, step), n - t]
+
+    return np.array([(x, y) for y in starts(h, th) for x in starts(w, tw)], dtype=np.int64).reshape(-1, 2)
+
+
+def tile_batch(im, im0s, size, overlap=0.2):
+    """
+    Build one model batch holding, for every image, its letterboxed full view followed by native-resolution tiles.
+
+    im is the letterboxed (B, 3, h, w) 0-1 batch, im0s the original BGR frames. The full views are padded at the
+    bottom/right to the tile size so everything stacks, which leaves their letterbox coordinates unchanged. Returns
+    the batch and the tile origins of every image.
+    """
+    th, tw = size
+    views = F.pad(im, (0, tw - im.shape[3], 0, th - im.shape[2]), value=114 / 255)
+    batch, layouts = [], []
+    for view, im0 in zip(views, im0s):
+        h, w = im0.shape[:2]
+        origins = tile_origins(h, w, size, overlap)
+        if h < th or w < tw:  # frame smaller than a tile
+            im0 = np.pad(im0, ((0, max(th - h, 0)), (0, max(tw - w, 0)), (0, 0)), constant_values=114)
+        tiles = np.stack([im0[y : y + th, x : x + tw] for x, y in origins])
+        tiles = torch.from_numpy(np.ascontiguousarray(tiles[..., ::-1].transpose(0, 3, 1, 2)))  # BGR HWC to RGB CHW
+        tiles = tiles.to(im.device).to(im.dtype) / 255
+        batch += [view[None], tiles]
+        layouts.append(origins)
+    return torch.cat(batch), layouts
+
+
+def merge_tiles(dets, layouts, size, im_shape, im0_shapes, iou_thres=0.45, max_det=1000, agnostic=False, margin=2):
+    """
+    Merge per-item NMS output of a `tile_batch` back into one (N, 6) detection tensor per original image.
+
+    Full-view boxes are scaled to the frame with scale_boxes from the letterboxed im_shape, tile boxes are shifted by
+    their tile origin. Tile boxes cut off by an inner tile edge are dropped: the overlapping neighbour sees the whole
+    object, and the full view covers objects larger than the overlap. A cross-tile NMS then removes the duplicates.
+    """
+    th, tw = size
+    out, i = [], 0
+    for origins, shape in zip(layouts, im0_shapes):
+        h, w = shape[:2]
+        full, tiles = dets[i].clone(), dets[i + 1 : i + 1 + len(origins)]
+        i += 1 + len(origins)
+        full[:, :4] = scale_boxes(im_shape, full[:, :4], shape)
+        merged = [full]
+        for det, (x, y) in zip(tiles, origins.tolist()):
+            if not len(det):
+                continue
+            b = det[:, :4]
+            keep = torch.ones(len(det), dtype=torch.bool, device=det.device)
+            if x > 0:
+                keep &= b[:, 0] > margin
+            if y > 0:
+                keep &= b[:, 1] > margin
+            if x + tw < w:
+                keep &= b[:, 2] < tw - margin
+            if y + th < h:
+                keep &= b[:, 3] < th - margin
+            det = det[keep].clone()
+            det[:, :4] += det.new_tensor([x, y, x, y])
+            merged.append(det)
+        det = torch.cat(merged)
+        det[:, [0, 2]] = det[:, [0, 2]].clamp(0, w)
+        det[:, [1, 3]] = det[:, [1, 3]].clamp(0, h)
+        cls = torch.zeros_like(det[:, 5]) if agnostic else det[:, 5]
+        keep = torchvision.ops.batched_nms(det[:, :4], det[:, 4], cls, iou_thres)[:max_det]  # cross-tile NMS
+        out.append(det[keep])
+    return out
@@ -0,0 +1,396 @@
+import ast
+import asyncio
+import hashlib
+import heapq
+import io
+import itertools
+import os
+import shutil
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+from pipeline.tts_backends import default_backend
+
+CACHE_DIR = Path(os.getenv("UC4ME_CACHE", Path.home() / ".cache" / "uc4me")) / "tts"  # override with UC4ME_CACHE
+URGENT, NORMAL = 0, 1  # SpeechWorker priorities, lower is spoken first
+
+
+def static_prompts(path):
+    """Every string literal passed to a speak() call in the Python file at path, in order of appearance"""
+    prompts = []
+    nodes = ast.walk(ast.parse(Path(path).read_text(encoding="utf-8")))
+    for node in sorted(nodes, key=lambda n: (getattr(n, "lineno", 0), getattr(n, "col_offset", 0))):
+        if (
+            isinstance(node, ast.Call)
+            and getattr(node.func, "attr", getattr(node.func, "id", None)) == "speak"
+            and node.args
+            and isinstance(node.args[0], ast.Constant)
+            and isinstance(node.args[0].value, str)
+            and node.args[0].value not in prompts
+        ):
+            prompts.append(node.args[0].value)
+    return prompts
+
+
+async def _single(audio):
+    yield audio
+
+
+class PhraseCache:
+    """
+    Two-level cache of synthesized speech, an in-memory LRU of `max_items` phrases in front of a directory.
+
+    Files are content-addressed by a hash of engine, voice and text, so a changed voice or wording is a new entry and
+    nothing has to be invalidated. Only phrases that repeat go to disk: the pre-warmed fixed prompts, and any other
+    phrase the first time it is hit in memory. One-off replies ("São 14:05", "Detetei 3 objetos...") stay in memory
+    only, so the directory stays bounded by the phrases worth keeping. With a FallbackTTS `backend` a lookup takes the
+    audio of whichever engine of the chain has it, in chain order, and a miss is stored under the engine that spoke it.
+    `open` returns cached audio or synthesizes and stores it chunk by chunk, `synthesize` does the same in one piece,
+    `prewarm` synthesizes the fixed prompts ahead of time. `hits` and `misses` count lookups from either level.
+    """
+
+    def __init__(self, backend=None, cache_dir=CACHE_DIR, max_items=64):
+        self.backend = backend or default_backend()
+        self.cache_dir = Path(cache_dir)
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # text -> (audio, engine, on_disk)
+        self._lock = threading.Lock()  # speak() and the pre-warm thread use the cache at the same time
+
+    def path(self, text, engine):
+        key = hashlib.sha256(f"{engine.name}\n{engine.voice}\n{text}".encode()).hexdigest()[:16]
+        return self.cache_dir / f"{key}.{engine.format}"
+
+    def _lookup(self, text):
+        """(audio, engine) of text from memory or disk, or None. A memory hit is a repeat, it is written to disk"""
+        with self._lock:
+            cached = self._memory.get(text)
+            if cached is not None:
+                self._memory.move_to_end(text)
+        if cached is not None:
+            audio, engine, on_disk = cached
+            if not on_disk:
+                self.put(text, audio, engine)
+            return audio, engine
+        for engine in getattr(self.backend, "backends", [self.backend]):
+            f = self.path(text, engine)
+            if f.exists():
+                audio = f.read_bytes()
+                self._remember(text, audio, engine, on_disk=True)
+                return audio, engine
+        return None
+
+    def get(self, text):
+        """(audio, engine) of text if it is cached, else None"""
+        cached = self._lookup(text)
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return cached
+
+    def put(self, text, audio, engine, persist=True):
+        """Cache audio of text in memory, and on disk if persist"""
+        self._remember(text, audio, engine, on_disk=persist)
+        if not persist:
+            return
+        f = self.path(text, engine)
+        f.parent.mkdir(parents=True, exist_ok=True)
+        tmp = f.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(audio)
+        os.replace(tmp, f)  # atomic, another process never reads a half-written file
+
+    def _remember(self, text, audio, engine, on_disk=False):
+        with self._lock:
+            self._memory[text] = audio, engine, on_disk
+            self._memory.move_to_end(text)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    async def open(self, text):
+        """(hit, engine, async iterator of audio chunks) for text, a miss is kept in memory once every chunk arrived"""
+        cached = self.get(text)
+        if cached is not None:
+            return True, cached[1], _single(cached[0])
+        engine, chunks = await self.backend.open(text)
+        return False, engine, self._store(text, engine, chunks)
+
+    async def _store(self, text, engine, chunks, persist=False):
+        audio = bytearray()
+        async for chunk in chunks:
+            audio += chunk
+            yield chunk
+        if audio:
+            self.put(text, bytes(audio), engine, persist)
+
+    async def synthesize(self, text):
+        """(audio, hit) for text, synthesized and stored on a miss"""
+        hit, _, chunks = await self.open(text)
+        return b"".join([chunk async for chunk in chunks]), hit
+
+    def prewarm(self, texts, concurrency=4):
+        """Synthesize the texts that are not cached yet and keep them on disk, returns how many were synthesized"""
+        missing = [t for t in dict.fromkeys(texts) if self._lookup(t) is None]
+
+        async def _prewarm():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(text):
+                async with semaphore:
+                    engine, chunks = await self.backend.open(text)
+                    async for _ in self._store(text, engine, chunks, persist=True):
+                        pass
+
+            results = await asyncio.gather(*(one(t) for t in missing), return_exceptions=True)
+            return sum(not isinstance(r, Exception) for r in results)
+
+        return asyncio.run(_prewarm()) if missing else 0
+
+    @property
+    def hit_rate(self):
+        return self.hits / max(self.hits + self.misses, 1)
+
+    def summary(self):
+        return f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), {len(self._memory)} in memory"
+
+
+def _wav(pcm, rate):
+    """Raw 16-bit mono PCM as a WAV file"""
+    f = io.BytesIO()
+    with wave.open(f, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    return f.getvalue()
+
+
+class StreamPlayer:
+    """
+    Plays TTS audio on the pygame mixer, starting on the first chunk when ffmpeg is there to decode incrementally.
+
+    Chunks (MP3, WAV or raw PCM, see TTSBackend) are piped into an ffmpeg process that decodes them to 16-bit PCM in
+    the mixer's format. Playback starts once `jitter` seconds of PCM are buffered and continues in `block`-second Sounds
+    queued on one channel, so the time to first sound is set by the first chunk instead of the whole sentence. Without
+    ffmpeg, or with `stream=False` (cached audio, which is all there already), the chunks are joined and played as one
+    file.
+    """
+
+    def __init__(self, rate=24000, jitter=0.15, block=0.1, decoder="ffmpeg"):
+        self.rate = rate  # Edge TTS sample rate, the mixer is opened at it so nothing is resampled
+        self.jitter = jitter
+        self.block = block
+        self.decoder = shutil.which(decoder)
+
+    def open(self):
+        """Open the playback device, unless something else already did"""
+        import pygame
+
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=self.rate, size=-16, channels=1)
+
+    async def play(self, chunks, fmt="mp3", rate=24000, stream=True, on_start=None):
+        """Play an async iterator of fmt audio chunks to the end, on_start() is called when the first sound goes out"""
+        import pygame
+
+        if not (stream and self.decoder):
+            audio = b"".join([chunk async for chunk in chunks])
+            if fmt == "s16le":
+                audio, fmt = _wav(audio, rate), "wav"
+            pygame.mixer.music.load(io.BytesIO(audio), fmt)
+            pygame.mixer.music.play()
+            if on_start:
+                on_start()
+            while pygame.mixer.music.get_busy():
+                await asyncio.sleep(0.02)
+            return
+
+        freq, _, channels = pygame.mixer.get_init()
+        frame = 2 * channels  # bytes per sample frame
+        block, jitter = int(self.block * freq) * frame, int(self.jitter * freq) * frame
+        source = ["-f", fmt] + (["-ar", str(rate), "-ac", "1"] if fmt == "s16le" else [])
+        proc = await asyncio.create_subprocess_exec(
+            self.decoder, "-loglevel", "error", "-probesize", "32", "-analyzeduration", "0", *source,
+            "-i", "pipe:0", "-f", "s16le", "-ar", str(freq), "-ac", str(channels), "pipe:1",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        )
+
+        async def feed():
+            try:
+                async for chunk in chunks:
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+            finally:
+                proc.stdin.close()
+
+        feeder = asyncio.ensure_future(feed())
+        channel, pcm = None, bytearray()
+        try:
+            while True:
+                data = await proc.stdout.read(block)
+                pcm += data
+                if channel is None and len(pcm) < jitter and data:
+                    continue  # fill the jitter buffer first
+                while len(pcm) >= block or (pcm and not data):
+                    sound = pygame.mixer.Sound(buffer=bytes(pcm[:block]))
+                    del pcm[:block]
+                    if channel is None:
+                        channel = pygame.mixer.Channel(0)
+                        channel.play(sound)
+                        if on_start:
+                            on_start()
+                    else:
+                        while channel.get_queue() is not None:  # a channel holds one queued Sound
+                            await asyncio.sleep(0.005)
+                        channel.queue(sound)  # plays right away if the channel ran dry
+                if not data:
+                    break
+            await feeder  # raises if synthesis failed
+            while channel is not None and channel.get_busy():
+                await asyncio.sleep(0.02)
+        finally:
+            feeder.cancel()
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+
+
+class SpeechWorker:
+    """
+    Speaks queued utterances on one thread that owns a persistent asyncio loop and the playback device (`player`).
+
+    `say` never blocks: it queues the text and returns a Future that resolves to True once the text has been spoken,
+    or False if it was dropped or failed, so callers wait only where the order matters (e.g. before recording starts).
+    Utterances go by priority, then in order. Saying a text that is still queued returns the queued Future instead of
+    speaking it twice, and `status` messages ("A processar...") that are still queued when anything newer arrives are
+    dropped, they would only describe a step that is already over. The thread starts with the first `say`. If the
+    playback device cannot be opened (no pygame, no audio device) the worker speaks through `direct`, an engine with
+    its own audio output such as Pyttsx3TTS, if there is one. Otherwise the error is kept in `error` and every queued
+    and later utterance resolves to False, so nobody waits forever on a worker that cannot speak.
+    """
+
+    def __init__(self, cache, player=None, metrics=None, direct=None):
+        self.cache = cache
+        self.player = player or StreamPlayer()
+        self.direct = direct
+        self.metrics = metrics  # anything with observe(stage, seconds) and inc(name, **labels), e.g. PrometheusMetrics
+        self.spoken = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = []  # heap of [priority, seq, text, status, future]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    def say(self, text, priority=NORMAL, status=False):
+        """Queue text, returns a Future of whether it was spoken"""
+        with self._cond:
+            for item in self._queue:
+                if item[2] == text:
+                    return item[4]  # merge with the queued copy
+            stale = [item for item in self._queue if item[3]]
+            if stale:
+                self._queue = [item for item in self._queue if not item[3]]
+                heapq.heapify(self._queue)
+                self.dropped += len(stale)
+            future = Future()
+            if self._closed:
+                future.set_result(False)
+                return future
+            heapq.heappush(self._queue, [priority, next(self._seq), text, status, future])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        for item in stale:
+            item[4].set_result(False)
+        return future
+
+    def _next(self):
+        """Block until there is an utterance, None once closed and drained"""
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            return heapq.heappop(self._queue) if self._queue else None
+
+    def _run(self):
+        try:
+            self.player.open()
+        except Exception as e:
+            if self.direct is not None and self.direct.available():
+                print(f"TTS: {e}, speaking through {self.direct.name} instead")
+                self.player = None
+            else:
+                print(f"TTS Error: {e}")
+                self.error = e
+                with self._cond:
+                    self._closed = True  # later say() calls resolve to False straight away
+                    items, self._queue = self._queue, []
+                for item in items:
+                    if item[4].set_running_or_notify_cancel():
+                        item[4].set_result(False)
+                return
+        loop = asyncio.new_event_loop()
+        try:
+            while (item := self._next()) is not None:
+                future = item[4]
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    loop.run_until_complete(self._speak(item[2]))
+                    self.spoken += 1
+                    future.set_result(True)
+                except Exception as e:
+                    print(f"TTS Error: {e}")
+                    future.set_result(False)
+        finally:
+            loop.close()
+
+    async def _speak(self, text):
+        start = time.perf_counter()
+        if self.player is None:  # no playback device of our own
+            await self.direct.say(text)
+            if self.metrics:
+                self.metrics.inc("tts_utterances", backend=self.direct.name)
+            return
+        hit, engine, chunks = await self.cache.open(text)
+        if self.metrics:
+            self.metrics.inc("tts_cache_lookups", result="hit" if hit else "miss")
+            self.metrics.inc("tts_utterances", backend=engine.name)
+
+        async def synthesized():
+            async for chunk in chunks:
+                yield chunk
+            self._observe("tts_synthesis", start)
+
+        first = []
+
+        def started():
+            first.append(time.perf_counter())
+
+        await self.player.play(synthesized(), engine.format, engine.rate, stream=not hit, on_start=started)
+        if first and self.metrics:
+            self.metrics.observe(f"tts_first_audio_{'hit' if hit else 'miss'}", first[0] - start)
+            self._observe("tts_playback", first[0])
+
+    def _observe(self, stage, start):
+        if self.metrics:
+            self.metrics.observe(stage, time.perf_counter() - start)
+
+    def close(self, timeout=None):
+        """Speak what is queued, then stop the thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def summary(self):
+        return f"{self.spoken} spoken, {self.dropped} stale status messages dropped"
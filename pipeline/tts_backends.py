@@ -0,0 +1,271 @@
+import asyncio
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PIPER_DIR = Path(os.getenv("UC4ME_CACHE", Path.home() / ".cache" / "uc4me")) / "piper"  # *.onnx + *.onnx.json voices
+PIPER_VOICES = {"pt-PT": "pt_PT-tugão-medium", "pt-BR": "pt_BR-faber-medium", "en-US": "en_US-lessac-medium"}
+
+
+class TTSBackend:
+    """
+    A speech engine. `stream(text)` is an async generator of encoded audio chunks in `format`: "mp3", "wav" or "s16le",
+    which is raw 16-bit mono PCM at `rate`. `available` is a cheap check that the engine is installed, it synthesizes
+    nothing. `name` and `voice` together identify the sound of the output, the phrase cache keys on them.
+    """
+
+    name = ""
+    format = "wav"
+    rate = 22050
+    voice = ""
+    streaming = True  # False if the first chunk only comes once the whole utterance is synthesized
+
+    def available(self):
+        return True
+
+    async def open(self, text):
+        """(backend that speaks, async iterator of its chunks), the same interface FallbackTTS has"""
+        return self, self.stream(text)
+
+    def stream(self, text):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.voice!r})"
+
+
+async def _process_stream(cmd, stdin=None, block=8192):
+    """Run cmd, optionally writing stdin to it, and yield its stdout as it comes"""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        if stdin is not None:
+            proc.stdin.write(stdin)
+            await proc.stdin.drain()
+            proc.stdin.close()
+        while chunk := await proc.stdout.read(block):
+            yield chunk
+        if await proc.wait():
+            raise RuntimeError(f"{Path(cmd[0]).name} exited with code {proc.returncode}")
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+class EdgeTTS(TTSBackend):
+    """Microsoft Edge neural voices, MP3 streamed over the network"""
+
+    name, format, rate = "edge", "mp3", 24000
+
+    def __init__(self, voice="pt-PT-RaquelNeural"):
+        self.voice = voice
+
+    def available(self):
+        return importlib.util.find_spec("edge_tts") is not None
+
+    async def stream(self, text):
+        import edge_tts
+
+        async for chunk in edge_tts.Communicate(text, self.voice).stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+
+class PiperTTS(TTSBackend):
+    """Piper neural voices, run locally by the piper binary, raw PCM streamed from its stdout"""
+
+    name, format = "piper", "s16le"
+
+    def __init__(self, model=None, lang="pt-PT"):
+        model = model or os.getenv("UC4ME_PIPER_MODEL") or PIPER_DIR / f"{PIPER_VOICES.get(lang, lang)}.onnx"
+        self.model = Path(model)
+        self.voice = self.model.stem
+        self.exe = shutil.which("piper")
+        config = Path(f"{self.model}.json")
+        self.rate = json.loads(config.read_text())["audio"]["sample_rate"] if config.exists() else 22050
+
+    def available(self):
+        return self.exe is not None and self.model.exists()
+
+    def stream(self, text):
+        return _process_stream([self.exe, "--model", str(self.model), "--output_raw"], stdin=text.encode() + b"\n")
+
+
+class EspeakTTS(TTSBackend):
+    """eSpeak NG formant synthesis, robotic but tens of milliseconds on any CPU, WAV from its stdout"""
+
+    name, format = "espeak", "wav"
+
+    def __init__(self, lang="pt-PT", speed=150):
+        self.voice = "pt" if lang == "pt-PT" else lang.lower()  # espeak-ng "pt" is European Portuguese
+        self.speed = speed
+        self.exe = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self):
+        return self.exe is not None
+
+    def stream(self, text):
+        return _process_stream([self.exe, "-v", self.voice, "-s", str(self.speed), "--stdout", text])
+
+
+class Pyttsx3TTS(TTSBackend):
+    """
+    The platform engine through pyttsx3 (SAPI5, NSSpeechSynthesizer or eSpeak), one WAV file per utterance. `say`
+    speaks through pyttsx3's own audio output instead, for when there is no pygame mixer to play the WAV.
+    """
+
+    name, format, streaming = "pyttsx3", "wav", False
+
+    def __init__(self, lang="pt-PT", rate=150, volume=0.9):
+        self.voice = lang
+        self.speech_rate = rate
+        self.volume = volume
+        self._engine = None
+        self._executor = ThreadPoolExecutor(1)  # pyttsx3 engines are not thread-safe, keep it on one thread
+
+    def available(self):
+        return importlib.util.find_spec("pyttsx3") is not None
+
+    def _init(self):
+        import pyttsx3
+
+        if self._engine is None:
+            self._engine = pyttsx3.init()
+            self._engine.setProperty("rate", self.speech_rate)
+            self._engine.setProperty("volume", self.volume)
+            prefix = self.voice.split("-")[0].lower()
+            for v in self._engine.getProperty("voices"):
+                langs = [lang.decode(errors="ignore") if isinstance(lang, bytes) else str(lang) for lang in v.languages]
+                if any(lang.strip("\x05").lower().startswith(prefix) for lang in langs):
+                    self._engine.setProperty("voice", v.id)
+                    break
+        return self._engine
+
+    def _synthesize(self, text):
+        self._init()
+        with tempfile.TemporaryDirectory() as tmp:
+            f = Path(tmp) / "speech.wav"
+            self._engine.save_to_file(text, str(f))
+            self._engine.runAndWait()
+            return f.read_bytes()
+
+    def _say(self, text):
+        engine = self._init()
+        engine.say(text)
+        engine.runAndWait()
+
+    async def stream(self, text):
+        yield await asyncio.get_running_loop().run_in_executor(self._executor, self._synthesize, text)
+
+    async def say(self, text):
+        """Speak text on the default audio device and return when done"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._say, text)
+
+
+async def _prepend(first, chunks):
+    yield first
+    async for chunk in chunks:
+        yield chunk
+
+
+async def first_audio(backend, text, timeout=3.0):
+    """Seconds until backend yields the first audio chunk of text"""
+    t = time.perf_counter()
+    chunks = backend.stream(text)
+    try:
+        await asyncio.wait_for(chunks.__anext__(), timeout)
+        return time.perf_counter() - t
+    finally:
+        await chunks.aclose()
+
+
+class FallbackTTS:
+    """
+    Chain of TTS backends: every utterance goes to the first backend that produces audio within `timeout` seconds.
+
+    A backend that fails or times out moves to the end of the chain, so without network the Edge engine costs one
+    timeout and then the local engines answer straight away. The timeout is not applied to the last backend left to
+    try, nor to engines that only yield once the whole utterance is synthesized (pyttsx3), whose first chunk of a long
+    text can take seconds. `probe` orders the chain by measured time to first audio,
+    unavailable engines are left out at construction. With `pinned` (UC4ME_TTS is set) the given order is kept.
+    """
+
+    def __init__(self, backends, timeout=1.0, pinned=False):
+        self.backends = [b for b in backends if b.available()]
+        self.timeout = timeout
+        self.pinned = pinned
+        self.latency = {}  # name -> seconds to first audio, None if it failed, filled by probe
+        self._lock = threading.Lock()
+
+    async def open(self, text):
+        """(backend that speaks, async iterator of its chunks) from the first backend that starts producing audio"""
+        errors = []
+        backends = list(self.backends)
+        for i, backend in enumerate(backends):
+            chunks = backend.stream(text)
+            timeout = self.timeout if backend.streaming and i < len(backends) - 1 else None
+            try:
+                first = await asyncio.wait_for(chunks.__anext__(), timeout)
+            except Exception as e:
+                await chunks.aclose()
+                errors.append(f"{backend.name}: {type(e).__name__} {e}")
+                self._demote(backend)
+                continue
+            return backend, _prepend(first, chunks)
+        raise RuntimeError(f"no TTS backend produced audio ({'; '.join(errors) or 'none available'})")
+
+    def _demote(self, backend):
+        with self._lock:
+            self.backends = [b for b in self.backends if b is not backend] + [backend]
+
+    def probe(self, text="Olá", timeout=3.0):
+        """Time the first audio of every backend one after the other and order the chain fastest first, failed last"""
+        latency = {}
+
+        async def _probe():
+            for backend in self.backends:
+                try:
+                    latency[backend] = await first_audio(backend, text, timeout)
+                except Exception:
+                    latency[backend] = None
+
+        asyncio.run(_probe())
+        if not self.pinned:
+            with self._lock:
+                self.backends = sorted(self.backends, key=lambda b: (latency[b] is None, latency[b] or 0.0))
+        self.latency = {b.name: latency[b] for b in self.backends}
+        return self.latency
+
+    def summary(self):
+        if not self.backends:
+            return "no TTS backend available"
+        ms = {k: "failed" if v is None else f"{v * 1e3:.0f} ms" for k, v in self.latency.items()}
+        return " > ".join(f"{b.name} ({ms[b.name]})" if b.name in ms else b.name for b in self.backends)
+
+
+def default_backend(voice="pt-PT-RaquelNeural", timeout=1.0):
+    """
+    FallbackTTS over every engine for the language of the Edge `voice`, Edge first until `probe` has measured them.
+    UC4ME_TTS pins the engines and their order, e.g. UC4ME_TTS=piper,espeak for offline only.
+    """
+    lang = "-".join(voice.split("-")[:2])
+    engines = {
+        "edge": EdgeTTS(voice),
+        "piper": PiperTTS(lang=lang),
+        "espeak": EspeakTTS(lang),
+        "pyttsx3": Pyttsx3TTS(lang),
+    }
+    order = os.getenv("UC4ME_TTS")
+    names = [n.strip() for n in order.split(",")] if order else list(engines)
+    return FallbackTTS([engines[n] for n in names], timeout, pinned=bool(order))
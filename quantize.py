@@ -0,0 +1,220 @@
+"""
+Export YOLOv5 weights to ONNX and quantize them to INT8 for CPU inference, calibrated on a local image folder.
+
+Static post-training quantization: activation ranges are measured on the calibration images, so no retraining and no
+labels are needed. The box-decoding math of the Detect head stays FP32, it is cheap and sensitive to rounding. The
+outputs carry stride and class names and load through DetectMultiBackend like any other export.
+
+Usage:
+    $ python quantize.py --weights yolov5n.pt --data calib/ --format openvino   # yolov5n_int8_openvino_model/
+    $ python quantize.py --weights yolov5n.pt --data calib/ --format onnx       # yolov5n_int8.onnx
+
+Usage - run the quantized model:
+    $ python detect.py --weights yolov5n_int8_openvino_model/ --device cpu
+    $ UC4ME_WEIGHTS=yolov5n_int8_openvino_model/ python teste_model_tts.py
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parents[0]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from models.experimental import attempt_load
+from models.yolo import Detect
+from utils.augmentations import letterbox
+from utils.dataloaders import IMG_FORMATS
+from utils.general import LOGGER, check_img_size, check_requirements, colorstr, cv2, yaml_save
+from utils.torch_utils import select_device
+
+
+def load_image(file, imgsz, stride):
+    """Letterboxed, normalized (1, 3, h, w) float32 model input from an image file"""
+    im = letterbox(cv2.imread(str(file)), imgsz, stride=stride, auto=False)[0]
+    im = im.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
+    return np.ascontiguousarray(im, dtype=np.float32)[None] / 255
+
+
+def calibration_files(data, n):
+    """Up to n image files of the calibration folder, spread evenly over it"""
+    files = sorted(p for p in Path(data).rglob("*.*") if p.suffix[1:].lower() in IMG_FORMATS)
+    assert files, f"no calibration images found in {data}"
+    return [files[i] for i in np.linspace(0, len(files) - 1, min(n, len(files))).round().astype(int)]
+
+
+def export_onnx(model, im, file, metadata, opset=12):
+    """FP32 ONNX with a dynamic batch axis, so batched detect.run and the detection server can use it"""
+    check_requirements("onnx>=1.12.0")
+
+    f = file.with_suffix(".onnx")
+    torch.onnx.export(
+        model,
+        im,
+        f,
+        opset_version=opset,
+        do_constant_folding=True,
+        input_names=["images"],
+        output_names=["output0"],
+        dynamic_axes={"images": {0: "batch"}, "output0": {0: "batch"}},
+    )
+    add_metadata(f, metadata)
+    LOGGER.info(f"{colorstr('ONNX:')} FP32 model saved as {f}")
+    return f
+
+
+def add_metadata(f, metadata):
+    """Store stride and names in an ONNX file, where DetectMultiBackend looks for them"""
+    import onnx
+
+    model_onnx = onnx.load(f)
+    del model_onnx.metadata_props[:]
+    for k, v in metadata.items():
+        meta = model_onnx.metadata_props.add()
+        meta.key, meta.value = k, str(v)
+    onnx.save(model_onnx, f)
+
+
+def head_nodes(f, head):
+    """Names of the non-Conv nodes of the Detect head (module index `head`), kept FP32"""
+    import onnx
+
+    return [n.name for n in onnx.load(f).graph.node if f"/model.{head}/" in n.name and n.op_type != "Conv"]
+
+
+def quantize_onnx(f, files, imgsz, stride, metadata, head):
+    """QDQ INT8 ONNX for ONNX Runtime: per-channel int8 weights, uint8 activations calibrated by MinMax"""
+    check_requirements("onnxruntime")
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.files = iter(files)
+
+        def get_next(self):
+            file = next(self.files, None)
+            return None if file is None else {"images": load_image(file, imgsz, stride)}
+
+    q = f.with_name(f"{f.stem}_int8.onnx")
+    quantize_static(
+        f,
+        q,
+        Reader(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        nodes_to_exclude=head_nodes(f, head),
+    )
+    add_metadata(q, metadata)  # quantize_static does not carry the metadata over
+    LOGGER.info(f"{colorstr('ONNX INT8:')} model saved as {q}")
+    return q
+
+
+def quantize_openvino(f, files, imgsz, stride, metadata, head):
+    """INT8 OpenVINO IR through NNCF, with the box-decoding ops of the head left in FP32"""
+    check_requirements(("openvino>=2023.0", "nncf>=2.7.0"))
+    import nncf
+    import openvino as ov
+
+    d = f.with_name(f"{f.stem}_int8_openvino_model")
+    d.mkdir(exist_ok=True)
+    dataset = nncf.Dataset(files, lambda file: load_image(file, imgsz, stride))
+    q = nncf.quantize(
+        ov.convert_model(f),
+        dataset,
+        preset=nncf.QuantizationPreset.MIXED,
+        subset_size=len(files),
+        # Same nodes as the ONNX path, ONNX node names survive conversion. Not validated, a few are folded away by it
+        ignored_scope=nncf.IgnoredScope(names=head_nodes(f, head), validate=False),
+    )
+    ov.save_model(q, d / f"{f.stem}.xml", compress_to_fp16=False)
+    yaml_save(d / f"{f.stem}.yaml", metadata)  # read by DetectMultiBackend next to the .xml
+    LOGGER.info(f"{colorstr('OpenVINO INT8:')} model saved as {d}")
+    return d
+
+
+def run(
+    weights=ROOT / "yolov5n.pt",  # FP32 PyTorch weights
+    data=ROOT / "data/images",  # calibration image folder
+    imgsz=(640, 640),  # inference size (height, width), fixed in the exported model
+    format="openvino",  # onnx (ONNX Runtime) or openvino
+    calib_images=300,  # calibration images used from data
+    opset=12,  # ONNX opset version
+    device="cpu",  # export device
+):
+    """
+    Export weights to FP32 ONNX, then quantize that to INT8 with static calibration on images from `data`.
+
+    Args:
+        weights (str | Path): FP32 PyTorch weights. Default is 'yolov5n.pt'.
+        data (str | Path): Folder of calibration images, a few hundred frames from the target camera work best.
+            Default is 'data/images'.
+        imgsz (tuple[int, int]): Inference size (height, width), fixed in the exported model. Default is (640, 640).
+        format (str): 'onnx' for a QDQ model run by ONNX Runtime, 'openvino' for an OpenVINO IR quantized with NNCF.
+            Default is 'openvino'.
+        calib_images (int): Number of calibration images, spread evenly over `data`. Default is 300.
+        opset (int): ONNX opset version. Default is 12.
+        device (str): Export device. Default is 'cpu'.
+
+    Returns:
+        (Path): The INT8 model, loadable with `detect.py --weights`.
+    """
+    assert format in ("onnx", "openvino"), f"unknown format '{format}', use onnx or openvino"
+    model = attempt_load(weights, device=select_device(device), inplace=True, fuse=True)
+    stride = int(max(model.stride))
+    imgsz = check_img_size(imgsz, s=stride)
+    for m in model.modules():
+        if isinstance(m, Detect):
+            m.inplace = False
+            m.export = True  # single output tensor
+    im = torch.zeros(1, 3, *imgsz).to(next(model.parameters()).device)
+    for _ in range(2):
+        model(im)  # dry runs
+    metadata = {"stride": stride, "names": model.names}
+
+    f = export_onnx(model, im, Path(weights), metadata, opset)
+    files = calibration_files(data, calib_images)
+    LOGGER.info(f"Calibrating on {len(files)} images from {data}...")
+    head = len(model.model) - 1  # index of the Detect module
+    if format == "onnx":
+        return quantize_onnx(f, files, imgsz, stride, metadata, head)
+    return quantize_openvino(f, files, imgsz, stride, metadata, head)
+
+
+def parse_opt():
+    """
+    Parse command-line arguments for INT8 export.
+
+    Args:
+        --weights (str, optional): FP32 PyTorch weights. Defaults to ROOT / 'yolov5n.pt'.
+        --data (str, optional): Calibration image folder. Defaults to ROOT / 'data/images'.
+        --imgsz (list[int], optional): Inference size (height, width). Defaults to [640].
+        --format (str, optional): 'onnx' or 'openvino'. Defaults to 'openvino'.
+        --calib-images (int, optional): Number of calibration images. Defaults to 300.
+        --opset (int, optional): ONNX opset version. Defaults to 12.
+        --device (str, optional): Export device. Defaults to 'cpu'.
+
+    Returns:
+        argparse.Namespace: Parsed command-line arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", type=str, default=ROOT / "yolov5n.pt", help="FP32 model path")
+    parser.add_argument("--data", type=str, default=ROOT / "data/images", help="calibration image folder")
+    parser.add_argument("--imgsz", "--img", "--img-size", nargs="+", type=int, default=[640], help="image size h,w")
+    parser.add_argument("--format", type=str, default="openvino", choices=["onnx", "openvino"], help="INT8 format")
+    parser.add_argument("--calib-images", type=int, default=300, help="number of calibration images")
+    parser.add_argument("--opset", type=int, default=12, help="ONNX opset version")
+    parser.add_argument("--device", default="cpu", help="cuda device, i.e. 0 or 0,1,2,3 or cpu")
+    opt = parser.parse_args()
+    opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
+    return opt
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    run(**vars(opt))
@@ -0,0 +1,132 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics.utils.plotting import save_one_box
+
+
+class _Candidate:
+    """Best crop seen so far for one track"""
+
+    __slots__ = ("score", "crop", "cls", "stem", "last_seen", "last_saved", "dirty")
+
+    def __init__(self):
+        self.score = -1.0
+        self.crop = None
+        self.cls = 0
+        self.stem = ""
+        self.last_seen = 0
+        self.last_saved = 0
+        self.dirty = False
+
+
+MAX_SHARPNESS = (8 * 255) ** 2  # bound on sharpness(): 3x3 Laplacian of uint8 pixels, |response| <= 8 * 255
+
+
+def sharpness(crop, size=64):
+    """Variance of the Laplacian on a downscaled grayscale crop, higher is sharper"""
+    h, w = crop.shape[:2]
+    if max(h, w) > size:
+        scale = size / max(h, w)
+        crop = cv2.resize(crop, (max(int(w * scale), 1), max(int(h * scale), 1)), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+class CropManager:
+    """
+    Keep the best crop of every confirmed track and write it once instead of once per frame.
+
+    Candidates are scored by confidence, box size and sharpness. A crop is encoded when its track has not been seen
+    for `max_age` updates of its stream, every `refresh_interval` updates if that is > 0 and the crop improved, and
+    for all remaining tracks on `close`. JPEG encoding runs in a thread pool so the frame loop never waits on it, the
+    first encoding or write error is re-raised by `close`.
+    """
+
+    def __init__(self, save_dir, names, refresh_interval=0, max_age=30, workers=2):
+        self.save_dir = Path(save_dir)
+        self.names = names
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crop")
+        self.candidates = {}  # (stream, obj_id) -> _Candidate
+        self.updates = {}  # stream -> number of update() calls
+        self.encoded = 0
+        self.error = None
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def update(self, stream, stem, im0, tracks):
+        """
+        Offer this frame's confirmed tracks of `stream`, an (M, 7) [x1, y1, x2, y2, track_id, conf, cls] array. im0
+        must not be annotated yet.
+        """
+        n = self.updates[stream] = self.updates.get(stream, 0) + 1
+        tracks = np.asarray(tracks, dtype=np.float64).reshape(-1, 7)  # float64 keeps track ids exact
+        area = np.prod(tracks[:, 2:4] - tracks[:, :2], axis=1)
+        bases = tracks[:, 5] * np.sqrt(np.maximum(area, 1.0))  # confidence and size part of the score
+        for xyxy, obj_id, cls, base in zip(
+            tracks[:, :4], tracks[:, 4].astype(int).tolist(), tracks[:, 6].astype(int).tolist(), bases.tolist()
+        ):
+            c = self.candidates.get((stream, obj_id))
+            if c is None:
+                c = self.candidates[(stream, obj_id)] = _Candidate()
+                c.last_saved = n
+            c.last_seen = n
+            # Sharpness only matters when size and confidence, with the sharpest possible crop, could beat the best
+            if base * (1.0 + np.log1p(MAX_SHARPNESS)) <= c.score:
+                continue
+            crop = save_one_box(xyxy, im0, BGR=True, save=False)
+            if crop.size == 0:
+                continue
+            score = base * (1.0 + np.log1p(sharpness(crop)))
+            if score > c.score:
+                c.score, c.crop, c.cls, c.stem, c.dirty = score, crop.copy(), cls, stem, True
+
+        # Flush crops of tracks that ended, and refresh long-lived ones
+        for key, c in list(self.candidates.items()):
+            if key[0] != stream:
+                continue
+            if n - c.last_seen > self.max_age:
+                self._encode(key[1], c)
+                del self.candidates[key]
+            elif self.refresh_interval and n - c.last_saved >= self.refresh_interval and c.dirty:
+                self._encode(key[1], c)
+                c.last_saved = n
+
+    def _encode(self, obj_id, c):
+        if c.crop is None or not c.dirty:
+            return
+        file = self.save_dir / self.names[c.cls] / f"{c.stem}_{obj_id}.jpg"
+        self._prune()
+        self._futures.append(self.pool.submit(self._write, file, c.crop))
+        c.dirty = False
+
+    def _prune(self):
+        """Drop finished writes, keeping the first error for close()"""
+        pending = []
+        for f in self._futures:
+            if not f.done():
+                pending.append(f)
+            elif self.error is None and f.exception() is not None:
+                self.error = f.exception()
+        self._futures = pending
+
+    def _write(self, file, crop):
+        file.parent.mkdir(parents=True, exist_ok=True)
+        if not cv2.imwrite(str(file), crop):
+            raise OSError(f"could not write crop {file}")
+        with self._lock:
+            self.encoded += 1
+
+    def close(self):
+        """Encode the best crop of every remaining track and wait for all writes"""
+        for (_, obj_id), c in self.candidates.items():
+            self._encode(obj_id, c)
+        self.candidates.clear()
+        self.pool.shutdown(wait=True)
+        self._prune()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,237 @@
+import csv
+import json
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+COLUMNS = ("image", "frame", "track_id", "class", "name", "confidence", "x1", "y1", "x2", "y2", "width", "height")
+
+
+class ResultSink:
+    """
+    Buffered writer for per-frame tracking results.
+
+    `add` only appends the frame's arrays to an in-memory buffer. A background thread turns the buffer into one
+    columnar batch and hands it to `write_batch` whenever `max_rows` rows are pending or `flush_interval` seconds
+    have passed, so the frame loop never touches the filesystem. `close` flushes what is left and stops the thread.
+    Subclasses implement `write_batch(columns)` and optionally `close_file()`.
+    """
+
+    def __init__(self, path, names, max_rows=4096, flush_interval=2.0):
+        self.path = Path(path)
+        self.names = names
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.flushes = 0
+        self._pending = []
+        self._pending_rows = 0
+        self._closed = False
+        self.error = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def add(self, image, frame, shape, track_ids, classes, confidences, boxes, label=None):
+        """
+        Queue the confirmed objects of one frame. boxes are (N, 4) xyxy pixels, shape is im0.shape and label the
+        label-file stem used by YoloTxtSink.
+        """
+        n = len(track_ids)
+        if not n:
+            return
+        item = (
+            label,
+            image,
+            frame,
+            shape[:2],
+            np.asarray(track_ids, dtype=np.int64),
+            np.asarray(classes, dtype=np.int64),
+            np.asarray(confidences, dtype=np.float32),
+            np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+        )
+        with self._cond:
+            self._pending.append(item)
+            self._pending_rows += n
+            if self._pending_rows >= self.max_rows:
+                self._cond.notify()
+
+    def _take(self):
+        """Swap out the pending buffer and build one columnar batch from it"""
+        with self._cond:
+            pending, self._pending, self._pending_rows = self._pending, [], 0
+        if not pending:
+            return None
+        counts = [len(p[4]) for p in pending]
+        boxes = np.concatenate([p[7] for p in pending])
+        classes = np.concatenate([p[5] for p in pending])
+        shapes = np.repeat(np.array([p[3] for p in pending], dtype=np.int64), counts, axis=0)
+        return {
+            "label": np.repeat(np.array([p[0] for p in pending], dtype=object), counts),
+            "image": np.repeat(np.array([str(p[1]) for p in pending], dtype=object), counts),
+            "frame": np.repeat(np.array([p[2] for p in pending], dtype=np.int64), counts),
+            "track_id": np.concatenate([p[4] for p in pending]),
+            "class": classes,
+            "name": np.array([self.names[c] for c in classes.tolist()], dtype=object),
+            "confidence": np.concatenate([p[6] for p in pending]).astype(np.float64).round(5),
+            "x1": boxes[:, 0],
+            "y1": boxes[:, 1],
+            "x2": boxes[:, 2],
+            "y2": boxes[:, 3],
+            "width": shapes[:, 1],
+            "height": shapes[:, 0],
+        }
+
+    def flush(self):
+        """Write everything pending now, on the calling thread"""
+        batch = self._take()
+        if batch is not None:
+            self.write_batch(batch)
+            self.rows_written += len(batch["frame"])
+            self.flushes += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and self._pending_rows < self.max_rows:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:  # keep the frame loop alive, the error is re-raised by close()
+                self.error = e
+                break
+            if closed:
+                break
+
+    def close(self):
+        """Flush remaining rows, stop the background thread and close the output"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        try:
+            if self.error is None:
+                self.flush()
+        finally:
+            self.close_file()
+        if self.error is not None:
+            raise self.error
+
+    def write_batch(self, columns):
+        raise NotImplementedError
+
+    def close_file(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class YoloTxtSink(ResultSink):
+    """YOLO / Pascal-VOC label files, named after the label stem passed to `add`"""
+
+    def __init__(self, labels_dir, names, save_format=0, save_conf=False, **kwargs):
+        self.save_format = save_format
+        self.save_conf = save_conf
+        super().__init__(labels_dir, names, **kwargs)
+
+    def write_batch(self, columns):
+        wh = np.stack((columns["width"], columns["height"]), axis=1).astype(np.float32)
+        gn = np.concatenate((wh, wh), axis=1)  # normalization gain whwh
+        xyxy = np.stack((columns["x1"], columns["y1"], columns["x2"], columns["y2"]), axis=1)
+        if self.save_format == 0:  # YOLO normalized xywh
+            coords = np.concatenate(((xyxy[:, :2] + xyxy[:, 2:]) / 2, xyxy[:, 2:] - xyxy[:, :2]), axis=1) / gn
+        else:  # Pascal-VOC normalized xyxy
+            coords = xyxy / gn
+
+        # One row per line and one format string for the whole batch
+        rows = (columns["class"], coords, columns["confidence"]) if self.save_conf else (columns["class"], coords)
+        rows = np.column_stack(rows).tolist()
+        fmt = " ".join(["%g"] * (6 if self.save_conf else 5)) + "\n"
+
+        # Group rows by destination file so each label file is opened once per flush
+        files = defaultdict(list)
+        for stem, row in zip(columns["label"], rows):
+            files[stem].append(fmt % tuple(row))
+        for stem, lines in files.items():
+            with open(self.path / f"{stem}.txt", "a") as f:
+                f.writelines(lines)
+
+
+class CsvSink(ResultSink):
+    """All results in a single CSV file"""
+
+    def __init__(self, path, names, **kwargs):
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+        super().__init__(path, names, **kwargs)
+
+    def write_batch(self, columns):
+        self._writer.writerows(zip(*(columns[c].tolist() for c in COLUMNS)))
+        self._file.flush()
+
+    def close_file(self):
+        self._file.close()
+
+
+class JsonlSink(ResultSink):
+    """All results as one JSON object per line"""
+
+    def __init__(self, path, names, **kwargs):
+        self._file = open(path, "w")
+        super().__init__(path, names, **kwargs)
+
+    def write_batch(self, columns):
+        rows = zip(*(columns[c].tolist() for c in COLUMNS))
+        self._file.write("".join(json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in rows))
+        self._file.flush()
+
+    def close_file(self):
+        self._file.close()
+
+
+class ParquetSink(ResultSink):
+    """All results in a Parquet file, one row group per flush (requires pyarrow)"""
+
+    def __init__(self, path, names, **kwargs):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa, self._pq = pa, pq
+        self._writer = None
+        super().__init__(path, names, **kwargs)
+
+    def write_batch(self, columns):
+        table = self._pa.table({c: columns[c].tolist() if columns[c].dtype == object else columns[c] for c in COLUMNS})
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close_file(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class MultiSink:
+    """Fan one frame's results out to several sinks"""
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def __bool__(self):
+        return bool(self.sinks)
+
+    def add(self, *args, **kwargs):
+        for sink in self.sinks:
+            sink.add(*args, **kwargs)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
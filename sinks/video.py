@@ -0,0 +1,135 @@
+import platform
+import threading
+import time
+
+import cv2
+
+from pipeline.threaded import _STOP, StageQueue
+
+
+class FrameSink:
+    """
+    Consume frames on a dedicated thread fed through a bounded StageQueue.
+
+    policy='block' is lossless (the frame loop waits when the queue is full), policy='drop' discards the oldest queued
+    frame instead. Subclasses implement `handle(item)` and optionally `release()`. Errors raised on the sink thread
+    are re-raised by `close`.
+    """
+
+    def __init__(self, name, maxsize=8, policy="block"):
+        self.queue = StageQueue(name, maxsize, policy)
+        self.handled = 0
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        return self.queue.dropped
+
+    def put(self, item):
+        if self.error is None:
+            self.queue.put(item)
+
+    def _run(self):
+        try:
+            while (item := self.queue.get()) is not _STOP:
+                self.handle(item)
+        except Exception as e:  # keep the frame loop alive, the error is re-raised by close()
+            self.error = e
+            self.queue.stop.set()  # unblock a producer waiting on a full queue
+        finally:
+            self.release()
+
+    def close(self):
+        """Drain the queue, stop the thread and release its resources"""
+        if self.error is None:
+            self.queue.put(_STOP)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def handle(self, item):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def summary(self):
+        return f"{self.handled} frames, {self.dropped} dropped, {self.queue.summary()}"
+
+
+class VideoSink(FrameSink):
+    """Lossless MP4 recording, one cv2.VideoWriter per stream index opened and encoded on the sink thread"""
+
+    def __init__(self, maxsize=32):
+        self.writers = {}
+        super().__init__("video", maxsize, "block")
+
+    def open(self, index, path, fps, size):
+        """Start a new file for stream `index`, the previous one is released once its queued frames are written"""
+        self.put(("open", index, path, fps, size))
+
+    def write(self, index, im0):
+        self.put(("write", index, im0))
+
+    def handle(self, item):
+        if item[0] == "open":
+            _, index, path, fps, size = item
+            if index in self.writers:
+                self.writers[index].release()
+            self.writers[index] = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+        else:
+            _, index, im0 = item
+            self.writers[index].write(im0)
+            self.handled += 1
+
+    def release(self):
+        for writer in self.writers.values():
+            writer.release()
+        self.writers.clear()
+
+
+class PreviewSink:
+    """
+    cv2.imshow preview on the calling thread, which must be the main thread: HighGUI on macOS and some Qt builds
+    cannot create or update windows from any other thread. Every window is redrawn at most `max_fps` times per second,
+    frames in between are dropped rather than displayed, so cv2.waitKey costs the frame loop a bounded amount of time.
+    Windows are throttled independently, the streams of a multi-stream source all stay live.
+    """
+
+    name = "preview"
+    depth = 0  # nothing is queued, a frame is either shown or dropped
+
+    def __init__(self, max_fps=30):
+        self.interval = 1 / max_fps if max_fps else 0.0
+        self.windows = []
+        self.shown = {}  # window name -> frames shown
+        self.skipped = {}  # window name -> frames dropped
+        self._last = {}  # window name -> time of the last redraw
+
+    @property
+    def handled(self):
+        return sum(self.shown.values())
+
+    @property
+    def dropped(self):
+        return sum(self.skipped.values())
+
+    def show(self, name, im0):
+        if platform.system() == "Linux" and name not in self.windows:
+            self.windows.append(name)
+            cv2.namedWindow(name, cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO)  # allow window resize (Linux)
+            cv2.resizeWindow(name, im0.shape[1], im0.shape[0])
+        now = time.perf_counter()
+        if now - self._last.get(name, 0.0) < self.interval:
+            self.skipped[name] = self.skipped.get(name, 0) + 1
+            return
+        self._last[name] = now
+        cv2.imshow(name, im0)
+        cv2.waitKey(1)  # 1 millisecond
+        self.shown[name] = self.shown.get(name, 0) + 1
+
+    def summary(self):
+        windows = ", ".join(f"{k}: {n} shown, {self.skipped.get(k, 0)} dropped" for k, n in self.shown.items())
+        return f"{self.handled} frames shown, {self.dropped} dropped ({windows})"
@@ -1,41 +1,60 @@
-import speech_recognition as sr
 from pynput import keyboard
 import threading
 import time
-import cv2
-import torch
-import numpy as np
 import sys
-import pyaudio
-import edge_tts
-import asyncio
-import pygame
-import io
+import os
+
+from pipeline.tts import NORMAL, URGENT, PhraseCache, SpeechWorker
+from pipeline.tts_backends import default_backend
+
+# torch, cv2, numpy, pygame, pyaudio, edge_tts and speech_recognition are imported where they are first used, most
+# of them on the warm-up thread, so the keyboard listener is up long before they have loaded
 
 class IntegratedVoiceAssistant:
     def __init__(self):
-        self.recognizer = sr.Recognizer()
+        self.recognizer = None  # created on the warm-up thread
         self.is_recording = False
         self.audio_data = None
         self.recording_thread = None
         
-        # YOLO model
+        # YOLO model, or a client of the shared detection server when UC4ME_DETECT_SERVER is set
         self.yolo_model = None
+        self.detector = None
+        self.model_ok = False
+        self.ready = threading.Event()  # set once the warm-up thread is done, early G presses wait for it
+        self.exit_event = threading.Event()
+        
+        # Skip the detector when the scene has not changed since the last detected photo
+        self.motion_gate = None  # created on the warm-up thread
+        self.camera = None  # opened on the warm-up thread, released again after UC4ME_CAMERA_IDLE seconds unused
+        self.last_detections = None
+        self.photo_path = os.environ.get("UC4ME_PHOTO", "captured_image.jpg")  # empty to not archive photos
+        
+        # Live Prometheus metrics on http://127.0.0.1:<port>/metrics when UC4ME_METRICS_PORT is set
+        port = int(os.environ.get("UC4ME_METRICS_PORT", 0))
+        self.metrics = None
+        if port:
+            from pipeline.metrics import PrometheusMetrics
+            
+            self.metrics = PrometheusMetrics().serve(port)
         
         # Keyboard listener
         self.listener = None
         
         # PyAudio settings
         self.chunk = 1024
-        self.format = pyaudio.paInt16
+        self.format = None  # pyaudio.paInt16, set on the warm-up thread
         self.channels = 1
         self.rate = 44100
         
         # Edge TTS settings for European Portuguese
         self.voice = "pt-PT-RaquelNeural"  # European Portuguese female voice
         
-        # Initialize pygame for audio playback
-        pygame.mixer.init()
+        # Synthesized phrases are cached in memory and on disk, the fixed prompts are synthesized at startup
+        # and spoken in priority order by one long-lived worker, speak() only queues
+        self.tts_backend = default_backend(self.voice)  # Edge, Piper, eSpeak NG, pyttsx3, fastest first once probed
+        self.tts_cache = PhraseCache(self.tts_backend)
+        self.speech = SpeechWorker(self.tts_cache, metrics=self.metrics)
         
         print("🤖 Integrated Voice Assistant with Object Detection initialized!")
 
@@ -43,91 +62,98 @@ class IntegratedVoiceAssistant:
         """Load YOLOv5 nano model"""
         try:
             print("📦 Loading YOLOv5 model...")
-            self.speak("A carregar o modelo de deteção de objetos...")
             
-            model = torch.hub.load('ultralytics/yolov5', 'yolov5n', pretrained=True)
-            model.eval()
-            self.yolo_model = model
+            server = os.environ.get("UC4ME_DETECT_SERVER")
+            if server:
+                # Use the model already held by pipeline/server.py instead of loading another copy
+                from pipeline.server import DetectionClient
+                
+                self.detector = DetectionClient(server)
+                print(f"✅ Using the detection server at {server}")
+                return True
+            
+            # Bundled yolov5n.pt from the local cache, or e.g. an INT8 export from quantize.py in UC4ME_WEIGHTS
+            from pipeline.model_cache import load_model
+            
+            self.yolo_model = load_model(os.environ.get("UC4ME_WEIGHTS"))
             
             print("✅ YOLOv5 model loaded successfully!")
-            self.speak("Modelo carregado com sucesso!")
             return True
         except Exception as e:
             print(f"❌ Error loading YOLOv5 model: {e}")
-            self.speak("Erro ao carregar o modelo de deteção de objetos.")
+            self.speak("Erro ao carregar o modelo de deteção de objetos.", urgent=True)
             return False
 
-    def speak(self, text):
-        """Convert text to speech using Edge TTS"""
-        async def _speak():
-            try:
-                communicate = edge_tts.Communicate(text, self.voice)
-                
-                # Create audio data in memory
-                audio_data = io.BytesIO()
-                async for chunk in communicate.stream():
-                    if chunk["type"] == "audio":
-                        audio_data.write(chunk["data"])
-                
-                # Reset position to beginning
-                audio_data.seek(0)
-                
-                # Play audio using pygame
-                pygame.mixer.music.load(audio_data)
-                pygame.mixer.music.play()
-                
-                # Wait for playback to finish
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
-            except Exception as e:
-                print(f"TTS Error: {e}")
+    def speak(self, text, wait=False, status=False, urgent=False):
+        """Queue text on the speech worker, with wait=True return only once it has been spoken"""
+        future = self.speech.say(text, URGENT if urgent else NORMAL, status)
+        if wait:
+            future.result()
+        return future
+
+    def _observe(self, stage, start):
+        """Record the time since start (a perf_counter value) as a stage latency, if metrics are enabled"""
+        if self.metrics:
+            self.metrics.observe(stage, time.perf_counter() - start)
+
+    def _archive(self, frame):
+        """Save the photo to self.photo_path on a daemon thread, so JPEG encoding and the write stay off the reply"""
+        import cv2
         
-        # Run the async function
-        try:
-            asyncio.run(_speak())
-        except Exception as e:
-            print(f"Speech synthesis error: {e}")
+        if self.photo_path:
+            threading.Thread(target=cv2.imwrite, args=(self.photo_path, frame.copy()), daemon=True).start()
 
     def take_photo_and_detect(self):
         """Take a photo using OpenCV and run YOLOv5 object detection with voice output"""
+        from pipeline.detections import DetectionResult
+        from pipeline.motion import image_thumbnail
+        
         try:
             print("📸 Taking photo...")
-            self.speak("A tirar fotografia...")
+            self.speak("A tirar fotografia...", status=True)
             
-            # Initialize camera
-            cap = cv2.VideoCapture(0)
-            if not cap.isOpened():
+            # The camera service keeps the device open, the newest frame is already there
+            if not self.camera.start():
                 print("❌ Error: Could not open camera")
-                self.speak("Erro: não consegui aceder à câmara.")
+                self.speak("Erro: não consegui aceder à câmara.", urgent=True)
                 return
             
-            ret, frame = cap.read()
-            cap.release()
+            t = time.perf_counter()
+            frame = self.camera.latest()
+            self._observe("capture", t)
             
-            if not ret:
+            if frame is None:
                 print("❌ Error: Could not capture image")
-                self.speak("Erro: não consegui capturar a imagem.")
+                self.speak("Erro: não consegui capturar a imagem.", urgent=True)
                 return
             
-            # Save the captured image
-            cv2.imwrite('captured_image.jpg', frame)
+            # Archive the captured image in the background
+            self._archive(frame)
             print("✅ Photo captured!")
-            self.speak("Fotografia capturada!")
+            self.speak("Fotografia capturada!", status=True)
             
-            # Run inference
-            print("🔍 Running object detection...")
-            self.speak("A analisar objetos na imagem...")
-            results = self.yolo_model(frame)
-            
-            # Extract detected objects
-            detections = results.pandas().xyxy[0]
+            # Run inference, unless nothing changed since the last photo
+            thumb = image_thumbnail(frame)
+            if self.last_detections is not None and not self.motion_gate.changed(thumb):
+                print("⏭️ Scene unchanged, reusing the last detections")
+                detections = self.last_detections
+            else:
+                print("🔍 Running object detection...")
+                self.speak("A analisar objetos na imagem...", status=True)
+                t = time.perf_counter()
+                if self.detector:
+                    detections = DetectionResult(self.detector.detect(frame), self.detector.names)
+                else:
+                    detections = DetectionResult.from_results(self.yolo_model(frame))
+                self._observe("inference", t)
+                self.motion_gate.update(thumb)
+                
+                self.last_detections = detections
             
             if len(detections) > 0:
                 print(f"\n🎯 Detected {len(detections)} objects:")
                 objects = []
-                for _, detection in detections.iterrows():
-                    obj_name = detection['name']
-                    confidence = detection['confidence']
+                for obj_name, confidence in detections:
                     objects.append(f"{obj_name} com {confidence:.0%} de confiança")
                     print(f"- {obj_name} ({confidence:.2f})")
                 
@@ -140,7 +166,7 @@ class IntegratedVoiceAssistant:
                 
         except Exception as e:
             print(f"❌ Error in photo capture/detection: {e}")
-            self.speak("Erro durante a captura ou análise da imagem.")
+            self.speak("Erro durante a captura ou análise da imagem.", urgent=True)
 
     def count_g_presses_and_execute(self):
         """Count G key presses for 5 seconds and perform actions based on count"""
@@ -169,7 +195,7 @@ class IntegratedVoiceAssistant:
         print("\n" + "="*50)
         print("🎮 Press the G key as many times as you want!")
         print("⏰ You have 5 seconds starting... NOW!")
-        self.speak("Prima a tecla G quantas vezes quiser. Tem 5 segundos a partir de... agora!")
+        self.speak("Prima a tecla G quantas vezes quiser. Tem 5 segundos a partir de... agora!", wait=True)
         
         # Set up the key listener
         listener = keyboard.Listener(on_press=on_press)
@@ -188,11 +214,11 @@ class IntegratedVoiceAssistant:
         # Process based on number of presses
         if g_count == 1:
             print("📸 Taking photo and detecting objects...")
-            self.speak("A tirar fotografia e detetar objetos...")
+            self.speak("A tirar fotografia e detetar objetos...", status=True)
             self.take_photo_and_detect()
         elif 2 <= g_count <= 4:
             print("🎤 Starting voice recording and playback...")
-            self.speak("A iniciar gravação de voz...")
+            self.speak("A iniciar gravação de voz...", wait=True)
             self.is_recording = True
             self.recording_thread = threading.Thread(target=self._record_for_5_seconds)
             self.recording_thread.start()
@@ -212,6 +238,11 @@ class IntegratedVoiceAssistant:
         """Handle key press events"""
         try:
             if hasattr(key, 'char') and key.char and key.char.lower() == 'g':
+                if not self.ready.is_set():
+                    print("⏳ Still loading, your G press will be handled as soon as the model is ready...")
+                    self.ready.wait()
+                if not self.model_ok:
+                    return
                 # Start the G-key counting process
                 self.count_g_presses_and_execute()
         except AttributeError:
@@ -232,7 +263,7 @@ class IntegratedVoiceAssistant:
         print("2️⃣  Press G TWICE for Voice Assistant Mode")
         print("⏰ You have 3 seconds to choose...")
         
-        self.speak("Seleção de modo: Prima G uma vez para deteção de objetos, ou duas vezes para assistente de voz. Tem 3 segundos para escolher.")
+        self.speak("Seleção de modo: Prima G uma vez para deteção de objetos, ou duas vezes para assistente de voz. Tem 3 segundos para escolher.", wait=True)
         
         # Count G presses for mode selection
         g_count = 0
@@ -288,7 +319,7 @@ class IntegratedVoiceAssistant:
             return
         
         print("🔴 Starting 5-second recording...")
-        self.speak("A iniciar gravação de 5 segundos.")
+        self.speak("A iniciar gravação de 5 segundos.", wait=True)
         self._start_5_second_recording()
 
     def _start_5_second_recording(self):
@@ -299,6 +330,9 @@ class IntegratedVoiceAssistant:
 
     def _record_for_5_seconds(self):
         """Record audio for exactly 5 seconds using PyAudio"""
+        import pyaudio
+        import speech_recognition as sr
+        
         try:
             audio = pyaudio.PyAudio()
             
@@ -340,26 +374,32 @@ class IntegratedVoiceAssistant:
             
             self.is_recording = False
             print("✅ Recording completed! Processing...")
-            self.speak("Gravação completa! A processar...")
+            self.speak("Gravação completa! A processar...", status=True)
             self._process_audio()
             
         except Exception as e:
             print(f"❌ Recording error: {e}")
-            self.speak("Erro durante a gravação.")
+            self.speak("Erro durante a gravação.", urgent=True)
             self.is_recording = False
 
     def _process_audio(self):
         """Process the recorded audio and play it back"""
+        import speech_recognition as sr
+        
         if self.audio_data is None:
             print("❌ No audio data to process.")
             return
 
         try:
             print("🔄 Converting speech to text...")
-            self.speak("A converter voz para texto...")
+            self.speak("A converter voz para texto...", status=True)
             
             # Convert speech to text using European Portuguese
+            t = time.perf_counter()
             text = self.recognizer.recognize_google(self.audio_data, language='pt-PT')
+            self._observe("stt", t)
+            if self.metrics:
+                self.metrics.inc("utterances")
             print(f"📝 You said: '{text}'")
             
             # Play back what was said
@@ -387,43 +427,95 @@ class IntegratedVoiceAssistant:
         self.listener.start()
         return self.listener
 
+    def _prewarm_tts(self):
+        """Order the TTS engines by latency, then synthesize the fixed prompts of this file that are not cached yet"""
+        from pipeline.tts import static_prompts
+        
+        try:
+            self.tts_backend.probe()
+            print(f"🔊 TTS engines: {self.tts_backend.summary()}")
+            n = self.tts_cache.prewarm(static_prompts(__file__))
+            if n:
+                print(f"🔊 {n} prompts synthesized and cached")
+        except Exception as e:
+            print(f"TTS pre-warm error: {e}")
+
+    def _warm_up(self):
+        """Import the heavy modules, load the model and run a dummy frame through it, off the main thread"""
+        t = time.perf_counter()
+        try:
+            import edge_tts  # noqa: F401, loaded here so the first speak() does not pay for it
+            import numpy as np
+            import pyaudio
+            import pygame  # noqa: F401, the speech worker opens the playback device
+            import speech_recognition as sr
+            
+            from pipeline.camera import CameraService
+            from pipeline.motion import MotionGate
+            
+            # Open the camera first, its exposure settles while the model loads
+            self.camera = CameraService(idle_timeout=float(os.environ.get("UC4ME_CAMERA_IDLE", 60)))
+            self.camera.start()
+            self.format = pyaudio.paInt16
+            self.recognizer = sr.Recognizer()
+            self.motion_gate = MotionGate()
+            self.model_ok = self.load_yolo_model()
+            if self.model_ok:
+                # The first inference allocates buffers and picks kernels, better now than on the first photo
+                frame = np.zeros((480, 640, 3), dtype=np.uint8)
+                if self.detector:
+                    self.detector.detect(frame)
+                else:
+                    self.yolo_model(frame)
+        except Exception as e:
+            print(f"❌ Warm-up error: {e}")
+            self.model_ok = False
+        finally:
+            self.ready.set()
+        
+        if not self.model_ok:
+            print("❌ Failed to load YOLO model. Exiting...")
+            self.exit_event.set()
+            return
+        print(f"✅ Model ready in {time.perf_counter() - t:.1f}s")
+        self.speak("Sistema pronto! Prima G uma vez para deteção de objetos, ou 2 a 4 vezes para gravação de voz.")
+        self.speak("Prima a tecla G para começar.")
+
     def run(self):
         """Main run method"""
         try:
-            # Load YOLO model first
-            if not self.load_yolo_model():
-                print("❌ Failed to load YOLO model. Exiting...")
-                return
-            
-            # Start keyboard listener
+            # Keys first so the assistant reacts right away, the model loads and warms up in the background
             listener = self.start_keyboard_listener()
+            threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
+            threading.Thread(target=self._prewarm_tts, name="tts-prewarm", daemon=True).start()
             
-            print("\n🚀 Sistema pronto!")
+            print("\n🚀 Sistema pronto!\a")  # terminal bell as the ready cue, the spoken one follows warm-up
             print("\n📋 Instructions:")
             print("  • Press G ONCE: Take photo and detect objects")
             print("  • Press G 2-4 TIMES: Record voice and play it back")
             print("  • Press G 5+ TIMES: Invalid input")
             print("  • Press Ctrl+C to exit")
-
-            self.speak("Sistema pronto! Prima G uma vez para deteção de objetos, ou 2 a 4 vezes para gravação de voz.")
             
             print("\n Press 'G' to start...")
-            self.speak("Prima a tecla G para começar.")
             
-            # Keep the main thread alive
+            # Keep the main thread alive, until Ctrl+C or a failed warm-up
             try:
-                while True:
-                    time.sleep(1)
+                while not self.exit_event.wait(1):
+                    pass
             except KeyboardInterrupt:
                 print("\n\n👋 Exiting integrated assistant...")
-                self.speak("A sair do assistente integrado. Adeus!")
+                self.speak("A sair do assistente integrado. Adeus!", wait=True)
                 if self.is_recording:
                     self.is_recording = False
-                listener.stop()
+            listener.stop()
+            if self.camera:
+                self.camera.close()
+            self.speech.close()
+            print(f"🔊 TTS cache: {self.tts_cache.summary()}, {self.speech.summary()}")
                 
         except Exception as e:
             print(f"\n❌ Fatal error: {e}")
-            self.speak("Erro fatal do sistema.")
+            self.speak("Erro fatal do sistema.", wait=True, urgent=True)
 
 def main():
     print("\n🤖 Integrated Voice Assistant with Object Detection")
@@ -2,16 +2,14 @@ from pynput import keyboard
 import threading
 import time
 import cv2
-import torch
-import numpy as np
 import sys
 
+from pipeline.model_cache import load_model
+
 def load_yolo_model():
     """Load YOLOv5 nano model"""
     try:
-        model = torch.hub.load('ultralytics/yolov5', 'yolov5n', pretrained=True)
-        model.eval()
-        return model
+        return load_model()  # bundled yolov5n.pt, fused and cached locally, no network
     except Exception as e:
         print(f"Error loading YOLOv5 model: {e}")
         return None
@@ -1,47 +1,183 @@
-import numpy as np
-from collections import deque
-
-class STrack:
-    def __init__(self, tlwh, score, cls):
-        self.tlwh = np.asarray(tlwh, dtype=np.float32)
-        self.score = score
-        self.cls = cls
-        self.track_id = 0
-        self.frame_id = 0
-        self.tlbr = self.tlwh_to_tlbr(self.tlwh)
-        
-    @staticmethod
-    def tlwh_to_tlbr(tlwh):
-        ret = np.asarray(tlwh)
-        ret[2:] += ret[:2]
-        return ret
-
-class BYTETracker:
-    def __init__(self, track_thresh=0.5, track_buffer=30, match_thresh=0.8):
-        self.track_thresh = track_thresh
-        self.match_thresh = match_thresh
-        self.track_buffer = track_buffer
-        self.tracks = []
-        self.frame_count = 0
-        self.max_time_lost = track_buffer
-        self.next_id = 1
-
-    def update(self, dets, img_shape):
-        self.frame_count += 1
-        activated_stracks = []
-        lost_stracks = []
-        removed_stracks = []
-        
-        # Convert detections to STrack objects
-        detections = [STrack(d[:4], d[4], d[5]) for d in dets]
-        
-        # Simple tracking logic (replace with full ByteTrack implementation)
-        for track in detections:
-            track.track_id = self.next_id
-            self.next_id += 1
-            activated_stracks.append(track)
-        
-        self.tracks = [t for t in self.tracks if t not in removed_stracks]
-        self.tracks = activated_stracks + lost_stracks
-        
-        return self.tracks
\ No newline at end of file
+import numpy as np
+
+from trackers.kalman_filter import KalmanFilterXYAH
+from trackers.matching import box_iou, linear_assignment
+
+# Track states
+FREE, TRACKED, LOST = 0, 1, 2
+
+
+def xyxy_to_xyah(boxes):
+    """(N, 4) x1y1x2y2 boxes to center x, center y, aspect ratio, height"""
+    w, h = boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+    return np.stack((boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w / np.maximum(h, 1e-6), h), axis=1)
+
+
+def xyah_to_xyxy(xyah):
+    """(N, 4) center x, center y, aspect ratio, height boxes to x1y1x2y2"""
+    w = xyah[:, 2] * xyah[:, 3]
+    x1, y1 = xyah[:, 0] - w / 2, xyah[:, 1] - xyah[:, 3] / 2
+    return np.stack((x1, y1, x1 + w, y1 + xyah[:, 3]), axis=1)
+
+
+class BYTETracker:
+    """
+    ByteTrack multi-object tracker (Zhang et al., 2021).
+
+    All tracks live in preallocated arrays indexed by slot, so a frame only touches a handful of NumPy arrays instead
+    of one Python object per track. Slots of removed tracks are reused by new ones.
+    """
+
+    fields = ("mean", "covariance", "state", "activated", "track_id", "score", "cls", "start_frame", "last_frame")
+
+    def __init__(self, track_thresh=0.5, track_buffer=30, match_thresh=0.8, frame_rate=30, low_thresh=0.1, capacity=64):
+        self.track_thresh = track_thresh
+        self.match_thresh = match_thresh
+        self.low_thresh = low_thresh
+        self.track_buffer = track_buffer
+        self.det_thresh = track_thresh + 0.1
+        self.max_time_lost = int(frame_rate / 30.0 * track_buffer)
+        self.frame_count = 0
+        self.next_id = 1
+        self.kalman_filter = KalmanFilterXYAH()
+
+        # Struct-of-arrays track state
+        self.mean = np.zeros((capacity, 8), dtype=np.float32)
+        self.covariance = np.zeros((capacity, 8, 8), dtype=np.float32)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.activated = np.zeros(capacity, dtype=bool)
+        self.track_id = np.zeros(capacity, dtype=np.int64)
+        self.score = np.zeros(capacity, dtype=np.float32)
+        self.cls = np.zeros(capacity, dtype=np.int64)
+        self.start_frame = np.zeros(capacity, dtype=np.int64)
+        self.last_frame = np.zeros(capacity, dtype=np.int64)
+
+    def _grow(self, needed):
+        """Double the slot capacity until `needed` more free slots are available"""
+        capacity = len(self.state)
+        free = int((self.state == FREE).sum())
+        if free >= needed:
+            return
+        new_capacity = capacity
+        while new_capacity - capacity + free < needed:
+            new_capacity *= 2
+        for name in self.fields:
+            arr = getattr(self, name)
+            grown = np.zeros((new_capacity, *arr.shape[1:]), dtype=arr.dtype)
+            grown[:capacity] = arr
+            setattr(self, name, grown)
+
+    def _update_tracks(self, slots, dets):
+        """Kalman-correct `slots` with the matched detections and mark them tracked"""
+        if not len(slots):
+            return
+        self.mean[slots], self.covariance[slots] = self.kalman_filter.update(
+            self.mean[slots], self.covariance[slots], xyxy_to_xyah(dets[:, :4])
+        )
+        self.score[slots] = dets[:, 4]
+        self.cls[slots] = dets[:, 5].astype(np.int64)
+        self.state[slots] = TRACKED
+        self.activated[slots] = True
+        self.last_frame[slots] = self.frame_count
+
+    def _new_tracks(self, dets):
+        """Start tracks for unmatched high-score detections"""
+        if not len(dets):
+            return
+        self._grow(len(dets))
+        slots = np.nonzero(self.state == FREE)[0][: len(dets)]
+        self.mean[slots], self.covariance[slots] = self.kalman_filter.initiate(xyxy_to_xyah(dets[:, :4]))
+        self.score[slots] = dets[:, 4]
+        self.cls[slots] = dets[:, 5].astype(np.int64)
+        self.state[slots] = TRACKED
+        self.activated[slots] = self.frame_count == 1  # only the very first frame confirms tracks immediately
+        self.track_id[slots] = np.arange(self.next_id, self.next_id + len(slots))
+        self.next_id += len(slots)
+        self.start_frame[slots] = self.last_frame[slots] = self.frame_count
+
+    def _remove_duplicates(self):
+        """Drop whichever of an overlapping tracked/lost pair has the shorter history"""
+        tracked = np.nonzero(self.state == TRACKED)[0]
+        lost = np.nonzero(self.state == LOST)[0]
+        if not len(tracked) or not len(lost):
+            return
+        boxes = xyah_to_xyxy(self.mean[:, :4])
+        rows, cols = np.nonzero(box_iou(boxes[tracked], boxes[lost]) > 0.85)
+        t, l = tracked[rows], lost[cols]
+        age_t, age_l = self.frame_count - self.start_frame[t], self.frame_count - self.start_frame[l]
+        self.state[np.where(age_t > age_l, l, t)] = FREE
+
+    def _predict(self):
+        """Kalman-predict every live track (tracked + lost) one frame ahead, lost tracks keep their height fixed"""
+        live = np.nonzero(self.state != FREE)[0]
+        if len(live):
+            mean = self.mean[live].copy()
+            mean[self.state[live] != TRACKED, 7] = 0
+            self.mean[live], self.covariance[live] = self.kalman_filter.predict(mean, self.covariance[live])
+        return live
+
+    def _output(self):
+        """Active tracks as an (M, 7) float64 array of [x1, y1, x2, y2, track_id, score, cls], exact for ids < 2**53"""
+        out = np.nonzero((self.state == TRACKED) & self.activated)[0]
+        return np.concatenate(
+            (
+                xyah_to_xyxy(self.mean[out, :4]).astype(np.float64),
+                self.track_id[out, None].astype(np.float64),
+                self.score[out, None].astype(np.float64),
+                self.cls[out, None].astype(np.float64),
+            ),
+            axis=1,
+        )
+
+    def predict(self):
+        """
+        Advance one frame that was not run through the detector and return the motion-predicted active tracks.
+
+        The frame still counts towards `max_time_lost`, but no track is matched, started or marked lost.
+        """
+        self.frame_count += 1
+        self._predict()
+        return self._output()
+
+    def update(self, dets, img_shape=None):
+        """
+        Update tracks with (N, 6) [x1, y1, x2, y2, score, cls] detections for one frame.
+
+        Returns an (M, 7) array of active tracks as [x1, y1, x2, y2, track_id, score, cls].
+        """
+        self.frame_count += 1
+        dets = np.asarray(dets, dtype=np.float32).reshape(-1, 6)
+        high = dets[dets[:, 4] >= self.track_thresh]
+        low = dets[(dets[:, 4] > self.low_thresh) & (dets[:, 4] < self.track_thresh)]
+
+        live = self._predict()
+        boxes = xyah_to_xyxy(self.mean[:, :4])
+
+        # First association: confirmed and lost tracks against high-score detections, IoU fused with score
+        pool = live[self.activated[live]]
+        cost = 1 - box_iou(boxes[pool], high[:, :4]) * high[None, :, 4]
+        matches, u_pool, u_high = linear_assignment(cost, self.match_thresh)
+        self._update_tracks(pool[matches[:, 0]], high[matches[:, 1]])
+
+        # Second association: remaining tracked (not lost) tracks against low-score detections
+        remain = pool[u_pool]
+        remain = remain[self.state[remain] == TRACKED]
+        matches, u_remain, _ = linear_assignment(1 - box_iou(boxes[remain], low[:, :4]), 0.5)
+        self._update_tracks(remain[matches[:, 0]], low[matches[:, 1]])
+        self.state[remain[u_remain]] = LOST
+
+        # Unconfirmed tracks (seen once) get one more chance against the leftover high-score detections
+        high = high[u_high]
+        unconfirmed = live[~self.activated[live]]
+        cost = 1 - box_iou(boxes[unconfirmed], high[:, :4]) * high[None, :, 4]
+        matches, u_unconfirmed, u_high = linear_assignment(cost, 0.7)
+        self._update_tracks(unconfirmed[matches[:, 0]], high[matches[:, 1]])
+        self.state[unconfirmed[u_unconfirmed]] = FREE
+
+        # New tracks, then expire tracks lost for longer than the buffer
+        high = high[u_high]
+        self._new_tracks(high[high[:, 4] >= self.det_thresh])
+        expired = (self.state == LOST) & (self.frame_count - self.last_frame > self.max_time_lost)
+        self.state[expired] = FREE
+        self._remove_duplicates()
+        return self._output()
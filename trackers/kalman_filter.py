@@ -0,0 +1,72 @@
+import numpy as np
+
+
+class KalmanFilterXYAH:
+    """
+    Constant velocity Kalman filter over (x, y, a, h, vx, vy, va, vh), where (x, y) is the box center, a the aspect
+    ratio and h the height. Every method works on stacked states so all tracks are predicted/updated in one call.
+    """
+
+    def __init__(self):
+        ndim, dt = 4, 1.0
+        self._motion_mat = np.eye(2 * ndim, dtype=np.float32)
+        self._motion_mat[:ndim, ndim:] = dt * np.eye(ndim, dtype=np.float32)
+        self._update_mat = np.eye(ndim, 2 * ndim, dtype=np.float32)
+
+        # Motion and observation uncertainty are chosen relative to the current box height
+        self._std_weight_position = 1.0 / 20
+        self._std_weight_velocity = 1.0 / 160
+
+    def initiate(self, measurement):
+        """Create states from (N, 4) xyah measurements, returns (N, 8) means and (N, 8, 8) covariances"""
+        measurement = np.asarray(measurement, dtype=np.float32).reshape(-1, 4)
+        mean = np.concatenate((measurement, np.zeros_like(measurement)), axis=1)
+        h = measurement[:, 3]
+        wp, wv = self._std_weight_position, self._std_weight_velocity
+        std = np.stack(
+            (2 * wp * h, 2 * wp * h, np.full_like(h, 1e-2), 2 * wp * h,
+             10 * wv * h, 10 * wv * h, np.full_like(h, 1e-5), 10 * wv * h),
+            axis=1,
+        )
+        return mean, self._diag(std**2)
+
+    def predict(self, mean, covariance):
+        """Run the prediction step on (N, 8) means and (N, 8, 8) covariances"""
+        h = mean[:, 3]
+        wp, wv = self._std_weight_position, self._std_weight_velocity
+        std = np.stack(
+            (wp * h, wp * h, np.full_like(h, 1e-2), wp * h,
+             wv * h, wv * h, np.full_like(h, 1e-5), wv * h),
+            axis=1,
+        )
+        mean = mean @ self._motion_mat.T
+        covariance = self._motion_mat @ covariance @ self._motion_mat.T + self._diag(std**2)
+        return mean, covariance
+
+    def project(self, mean, covariance):
+        """Project states into measurement space"""
+        h = mean[:, 3]
+        wp = self._std_weight_position
+        std = np.stack((wp * h, wp * h, np.full_like(h, 1e-1), wp * h), axis=1)
+        mean = mean @ self._update_mat.T
+        covariance = self._update_mat @ covariance @ self._update_mat.T + self._diag(std**2)
+        return mean, covariance
+
+    def update(self, mean, covariance, measurement):
+        """Run the correction step with (N, 4) xyah measurements"""
+        projected_mean, projected_cov = self.project(mean, covariance)
+        # K = P H^T S^-1, solved as S K^T = H P^T since S is symmetric
+        kalman_gain = np.linalg.solve(projected_cov, self._update_mat @ np.transpose(covariance, (0, 2, 1)))
+        kalman_gain = np.transpose(kalman_gain, (0, 2, 1))
+        innovation = np.asarray(measurement, dtype=np.float32) - projected_mean
+        mean = mean + np.einsum("nij,nj->ni", kalman_gain, innovation)
+        covariance = covariance - kalman_gain @ projected_cov @ np.transpose(kalman_gain, (0, 2, 1))
+        return mean.astype(np.float32), covariance.astype(np.float32)
+
+    @staticmethod
+    def _diag(values):
+        """Stack (N, D) vectors into (N, D, D) diagonal matrices"""
+        out = np.zeros((*values.shape, values.shape[-1]), dtype=np.float32)
+        idx = np.arange(values.shape[-1])
+        out[:, idx, idx] = values
+        return out
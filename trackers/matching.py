@@ -0,0 +1,149 @@
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional, fall back to greedy matching
+    linear_sum_assignment = None
+
+DENSE_LIMIT = 128 * 128  # max tracks x detections solved as a single class-masked matrix
+
+
+def box_iou(boxes1, boxes2):
+    """Pairwise IoU between two sets of xyxy boxes, returns a (N, M) matrix"""
+    boxes1 = np.asarray(boxes1, dtype=np.float32).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float32).reshape(-1, 4)
+    if len(boxes1) == 0 or len(boxes2) == 0:
+        return np.zeros((len(boxes1), len(boxes2)), dtype=np.float32)
+
+    # Work on (N, M) planes in place, the (N, M, 2) broadcast version is several times slower for large N, M
+    inter = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    inter -= np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    np.maximum(inter, 0, out=inter)
+    h = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    h -= np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    np.maximum(h, 0, out=h)
+    inter *= h
+
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :]
+    union -= inter
+    np.maximum(union, 1e-9, out=union)
+    inter /= union
+    return inter
+
+
+def class_iou(boxes1, cls1, boxes2, cls2):
+    """IoU matrix where pairs of different classes are forced to 0"""
+    iou = box_iou(boxes1, boxes2)
+    if iou.size:
+        iou[np.asarray(cls1)[:, None] != np.asarray(cls2)[None, :]] = 0.0
+    return iou
+
+
+def greedy_assignment(cost, thresh):
+    """Greedy one-to-one matching, cheapest pairs first"""
+    rows, cols = np.nonzero(cost <= thresh)
+    order = np.argsort(cost[rows, cols], kind="stable")
+    used_r = np.zeros(cost.shape[0], dtype=bool)
+    used_c = np.zeros(cost.shape[1], dtype=bool)
+    matches = []
+    for r, c in zip(rows[order], cols[order]):
+        if not used_r[r] and not used_c[c]:
+            used_r[r] = used_c[c] = True
+            matches.append((r, c))
+    return np.array(matches, dtype=np.int64).reshape(-1, 2)
+
+
+def _solve(cost, thresh):
+    """Matched (row, col) pairs of a one-to-one assignment with cost at most thresh"""
+    if linear_sum_assignment is None:
+        return greedy_assignment(cost, thresh)
+    # Pairs above the threshold can never be matched, make them prohibitively expensive
+    rows, cols = linear_sum_assignment(np.where(cost > thresh, thresh + 1e5, cost))
+    keep = cost[rows, cols] <= thresh
+    return np.stack((rows[keep], cols[keep]), axis=1).astype(np.int64)
+
+
+def linear_assignment(cost, thresh):
+    """
+    One-to-one assignment on a cost matrix, ignoring pairs with cost above thresh.
+
+    Returns (matches, unmatched_rows, unmatched_cols) where matches is a (K, 2) int array.
+    """
+    cost = np.asarray(cost, dtype=np.float32)
+    matches = _solve(cost, thresh) if cost.size else np.empty((0, 2), dtype=np.int64)
+    unmatched_rows = np.setdiff1d(np.arange(cost.shape[0]), matches[:, 0])
+    unmatched_cols = np.setdiff1d(np.arange(cost.shape[1]), matches[:, 1])
+    return matches, unmatched_rows, unmatched_cols
+
+
+def _same_key_pairs(track_key, det_key):
+    """All (track, det) index pairs sharing a key, generated without a Python loop over keys"""
+    t_order, d_order = np.argsort(track_key, kind="stable"), np.argsort(det_key, kind="stable")
+    t_sorted, d_sorted = track_key[t_order], det_key[d_order]
+    common = np.intersect1d(t_sorted, d_sorted)
+    t_lo, d_lo = np.searchsorted(t_sorted, common, "left"), np.searchsorted(d_sorted, common, "left")
+    nt = np.searchsorted(t_sorted, common, "right") - t_lo
+    nd = np.searchsorted(d_sorted, common, "right") - d_lo
+    sizes = nt * nd
+    block = np.repeat(np.arange(len(common)), sizes)
+    offset = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return t_order[t_lo[block] + offset // nd[block]], d_order[d_lo[block] + offset % nd[block]]
+
+
+def _sparse_associate(track_boxes, track_key, det_boxes, det_key, iou_thresh):
+    """
+    Assignment for large problems: IoU is only evaluated for same-key pairs, pairs that are the single candidate of
+    both their track and their detection are matched directly and only the ambiguous remainder goes to the solver.
+    """
+    ti, di = _same_key_pairs(track_key, det_key)
+    b1, b2 = track_boxes[ti], det_boxes[di]
+    inter = np.clip(np.minimum(b1[:, 2:], b2[:, 2:]) - np.maximum(b1[:, :2], b2[:, :2]), 0, None).prod(1)
+    area1, area2 = (b1[:, 2:] - b1[:, :2]).prod(1), (b2[:, 2:] - b2[:, :2]).prod(1)
+    iou = inter / np.maximum(area1 + area2 - inter, 1e-9)
+    keep = iou >= iou_thresh
+    ti, di, iou = ti[keep], di[keep], iou[keep]
+
+    t_count = np.bincount(ti, minlength=len(track_key))
+    d_count = np.bincount(di, minlength=len(det_key))
+    single = (t_count[ti] == 1) & (d_count[di] == 1)
+    matches = [np.stack((ti[single], di[single]), axis=1)]
+
+    amb = ~single
+    if amb.any():
+        rows, r_idx = np.unique(ti[amb], return_inverse=True)
+        cols, c_idx = np.unique(di[amb], return_inverse=True)
+        cost = np.ones((len(rows), len(cols)), dtype=np.float32)
+        cost[r_idx, c_idx] = 1 - iou[amb]
+        m = _solve(cost, 1 - iou_thresh)
+        matches.append(np.stack((rows[m[:, 0]], cols[m[:, 1]]), axis=1))
+    return np.concatenate(matches).astype(np.int64)
+
+
+def associate(track_boxes, track_cls, det_boxes, det_cls, iou_thresh):
+    """
+    Match detections to tracks of the same class by IoU.
+
+    Large problems only evaluate same-class pairs and send just the ambiguous ones to the solver, which keeps the cost
+    close to linear in the number of objects. Returns (matches, unmatched_tracks, unmatched_dets) like
+    linear_assignment.
+    """
+    track_boxes = np.asarray(track_boxes, dtype=np.float32).reshape(-1, 4)
+    det_boxes = np.asarray(det_boxes, dtype=np.float32).reshape(-1, 4)
+    track_cls = np.asarray(track_cls, dtype=np.int64).reshape(-1)
+    det_cls = np.asarray(det_cls, dtype=np.int64).reshape(-1)
+    nt, nd = len(track_cls), len(det_cls)
+
+    if nt * nd <= DENSE_LIMIT:
+        # Small problems: one class-masked IoU matrix and a single solve is cheaper than per-class Python overhead
+        matches = _solve(1 - class_iou(track_boxes, track_cls, det_boxes, det_cls), 1 - iou_thresh) if nt * nd else None
+    else:
+        matches = _sparse_associate(track_boxes, track_cls, det_boxes, det_cls, iou_thresh)
+    if matches is None:
+        matches = np.empty((0, 2), dtype=np.int64)
+
+    track_used, det_used = np.zeros(nt, dtype=bool), np.zeros(nd, dtype=bool)
+    track_used[matches[:, 0]] = True
+    det_used[matches[:, 1]] = True
+    return matches, np.nonzero(~track_used)[0], np.nonzero(~det_used)[0]
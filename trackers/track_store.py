@@ -0,0 +1,111 @@
+import numpy as np
+
+
+class TrackStore:
+    """
+    Fixed-layout storage for tracked objects, one row (slot) per track.
+
+    Every field is a preallocated NumPy array, confidences are kept as a running sum and count so the mean is O(1)
+    and memory stays flat no matter how long an object is in view. Slots freed by `remove` are handed out again by
+    `add`, capacity only grows (by doubling) when every slot is live. Track ids keep increasing across slot reuse.
+    `velocity` is a smoothed per-frame box displacement used to extrapolate tracks over frames without detections.
+    """
+
+    fields = (
+        "alive",
+        "track_id",
+        "stream",
+        "cls",
+        "boxes",
+        "velocity",
+        "first_seen",
+        "last_seen",
+        "conf_sum",
+        "conf_count",
+        "confirmed",
+    )
+
+    def __init__(self, capacity=64):
+        self.next_id = 0
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.track_id = np.zeros(capacity, dtype=np.int64)
+        self.stream = np.zeros(capacity, dtype=np.int64)
+        self.cls = np.zeros(capacity, dtype=np.int64)
+        self.boxes = np.zeros((capacity, 4), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 4), dtype=np.float32)
+        self.first_seen = np.zeros(capacity, dtype=np.int64)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+        self.conf_sum = np.zeros(capacity, dtype=np.float64)
+        self.conf_count = np.zeros(capacity, dtype=np.int64)
+        self.confirmed = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    @property
+    def capacity(self):
+        return len(self.alive)
+
+    @property
+    def live(self):
+        """Slots currently holding a track"""
+        return np.nonzero(self.alive)[0]
+
+    @property
+    def mean_conf(self):
+        """Running mean confidence for every slot (0 for empty slots)"""
+        return self.conf_sum / np.maximum(self.conf_count, 1)
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        free = capacity - len(self)
+        if free >= needed:
+            return
+        new_capacity = capacity
+        while new_capacity - capacity + free < needed:
+            new_capacity *= 2
+        for name in self.fields:
+            arr = getattr(self, name)
+            grown = np.zeros((new_capacity, *arr.shape[1:]), dtype=arr.dtype)
+            grown[:capacity] = arr
+            setattr(self, name, grown)
+
+    def add(self, boxes, conf, cls, frame_count, stream=0):
+        """Start new tracks in free slots, returns the slots used. frame_count and stream may be per-row arrays"""
+        n = len(boxes)
+        if not n:
+            return np.empty(0, dtype=np.int64)
+        self._grow(n)
+        slots = np.nonzero(~self.alive)[0][:n]
+        self.alive[slots] = True
+        self.track_id[slots] = np.arange(self.next_id, self.next_id + n)
+        self.next_id += n
+        self.stream[slots] = stream
+        self.cls[slots] = cls
+        self.boxes[slots] = boxes
+        self.velocity[slots] = 0
+        self.first_seen[slots] = self.last_seen[slots] = frame_count
+        self.conf_sum[slots] = conf
+        self.conf_count[slots] = 1
+        self.confirmed[slots] = False
+        return slots
+
+    def observe(self, slots, boxes, conf, frame_count, momentum=0.5):
+        """Record a new matched observation for existing tracks"""
+        gap = np.maximum(frame_count - self.last_seen[slots], 1)[:, None]
+        measured = (boxes - self.boxes[slots]) / gap
+        self.velocity[slots] = momentum * self.velocity[slots] + (1 - momentum) * measured
+        self.boxes[slots] = boxes
+        self.last_seen[slots] = frame_count
+        self.conf_sum[slots] += conf
+        self.conf_count[slots] += 1
+
+    def predict(self, slots, frame_count):
+        """Boxes of `slots` extrapolated from their last observation to frame_count (scalar or per-slot array)"""
+        age = np.asarray(frame_count - self.last_seen[slots], dtype=np.float32)
+        return self.boxes[slots] + self.velocity[slots] * age[..., None]
+
+    def remove(self, slots):
+        """Free slots so they can be reused"""
+        self.alive[slots] = False
+        self.confirmed[slots] = False
@@ -1,18 +1,19 @@
-import pyttsx3
 import speech_recognition as sr
 import keyboard
 from threading import Thread, Event
 from queue import Queue
 
-# Initialize TTS engine
-tts_engine = pyttsx3.init()
-tts_engine.setProperty('rate', 150)
-tts_engine.setProperty('volume', 0.9)
+from pipeline.tts import PhraseCache, SpeechWorker
+from pipeline.tts_backends import Pyttsx3TTS, default_backend
+
+# Same TTS engines as the assistants: Edge, Piper, eSpeak NG or pyttsx3, whichever answers fastest. They play
+# through pygame (pip install pygame, plus ffmpeg to start on the first chunk); without it pyttsx3 speaks directly
+tts_backend = default_backend("en-US-AriaNeural")
+speech = SpeechWorker(PhraseCache(tts_backend), direct=Pyttsx3TTS("en-US", rate=150, volume=0.9))
 
 def speak(text):
     """Convert text to speech"""
-    tts_engine.say(text)
-    tts_engine.runAndWait()
+    speech.say(text).result()
 
 def listen(stop_event, result_queue):
     """Convert speech to text while the key is pressed"""
@@ -87,6 +88,8 @@ if __name__ == "__main__":
     try:
         import keyboard
         print("Voice Assistant - Hold 'G' to speak, press 'Esc' to exit")
+        tts_backend.probe("Hello")
+        print(f"TTS engines: {tts_backend.summary()}")
         voice_interaction()
     except ImportError:
         print("Please install the 'keyboard' library first: pip install keyboard")
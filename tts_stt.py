@@ -1,14 +1,16 @@
-import pyttsx3
 import speech_recognition as sr
 
-tts_engine = pyttsx3.init()
-tts_engine.setProperty('rate', 150)
-tts_engine.setProperty('volume', 0.9)
+from pipeline.tts import PhraseCache, SpeechWorker
+from pipeline.tts_backends import Pyttsx3TTS, default_backend
+
+# Same TTS engines as the assistants: Edge, Piper, eSpeak NG or pyttsx3, whichever answers fastest. They play
+# through pygame (pip install pygame, plus ffmpeg to start on the first chunk); without it pyttsx3 speaks directly
+tts_backend = default_backend("en-US-AriaNeural")
+speech = SpeechWorker(PhraseCache(tts_backend), direct=Pyttsx3TTS("en-US", rate=150, volume=0.9))
 
 def speak(text):
     """Convert text to speech"""
-    tts_engine.say(text)
-    tts_engine.runAndWait()
+    speech.say(text).result()
 
 def listen():
     """Convert speech to text using microphone input"""
@@ -54,6 +56,8 @@ def voice_interaction():
             speak(f"You said: {command}. I'm still learning to respond to that.")
 
 if __name__ == "__main__":
+    tts_backend.probe("Hello")
+    print(f"TTS engines: {tts_backend.summary()}")
     print("Voice Assistant - Press Ctrl+C to exit")
     print("Available commands: ask my name, ask for time, say exit/quit/stop")
     voice_interaction()
\ No newline at end of file